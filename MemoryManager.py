@@ -1,6 +1,12 @@
 import json
+import os
+import sys
+import time
+import heapq
 from pprint import pprint
-from collections import namedtuple
+from collections import namedtuple, defaultdict
+
+import numpy as np
 
 Node = namedtuple(
     "Node",
@@ -9,55 +15,550 @@ Node = namedtuple(
 )
 Link = namedtuple("Link", ["source", "target", "strength"])
 
+def _node_from_dict(node):
+    return Node(
+        **{
+            "id": node["id"],
+            "name": node["name"],
+            "type": node["type"],
+            "tags": node.get("tags", []),
+            "recall_strength": node.get("recall_strength", 0.5)
+        }
+    )
+
+class NodeStore:
+    """
+    Struct-of-arrays storage for memory nodes.
+
+    recall_strength, type codes and last-update timestamps live in NumPy
+    arrays (grown by doubling); ids and names are interned strings and node
+    types are stored once in a code table. Indexing returns a Node view
+    built on demand, so callers can keep reading the store as a list of
+    Nodes, and the column properties are read-only array views. Writes
+    (write / append / set_recall) belong to MemoryAccess, which keeps its
+    recall heap, journal and dirty tracking in step with them; bulk updates
+    still run as single array operations on the columns.
+    """
+
+    def __init__(self, capacity=64):
+        self._size = 0
+        self.ids = []
+        self.names = []
+        self._tags = []
+        self.type_names = []
+        self._type_codes = {}
+        self._recall = np.zeros(capacity, dtype=np.float64)
+        self._type = np.zeros(capacity, dtype=np.int16)
+        self._updated = np.zeros(capacity, dtype=np.float64)
+        # text_revision[slot] is the value of text_version when the node's name or tags last changed,
+        # so indexes built from node text can find what to redo since the version they last saw
+        self._text_rev = np.zeros(capacity, dtype=np.int64)
+        self.text_version = 0
+        self.tag_index = defaultdict(set)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for slot in range(self._size):
+            yield self[slot]
+
+    def _slot(self, slot):
+        if slot < 0:
+            slot += self._size
+        if not 0 <= slot < self._size:
+            raise IndexError("node slot out of range")
+        return slot
+
+    def __getitem__(self, slot):
+        if isinstance(slot, slice):
+            return [self[i] for i in range(*slot.indices(self._size))]
+        slot = self._slot(slot)
+        tags = self._tags[slot]
+        return Node(
+            id=self.ids[slot],
+            name=self.names[slot],
+            type=self.type_names[self._type[slot]],
+            tags=list(tags) if tags else [],
+            recall_strength=float(self._recall[slot])
+        )
+
+    def write(self, slot, node, updated_at=None):
+        """Stores `node` at `slot`, stamped with `updated_at` (default: now)."""
+        self._write(self._slot(slot), node, updated_at)
+
+    def as_dict(self, slot):
+        """The node's persisted form: its Node fields plus the last-update timestamp."""
+        slot = self._slot(slot)
+        return {**self[slot]._asdict(), "updated_at": float(self._updated[slot])}
+
+    def _type_code(self, type_name):
+        code = self._type_codes.get(type_name)
+        if code is None:
+            code = len(self.type_names)
+            self.type_names.append(type_name)
+            self._type_codes[type_name] = code
+        return code
+
+    def _write(self, slot, node, updated_at=None):
+        tags = tuple(node.tags) if node.tags else None
+        if self.names[slot] != node.name or self._tags[slot] != tags:
+            self.text_version += 1
+            self._text_rev[slot] = self.text_version
+        for tag in self._tags[slot] or ():
+            self.tag_index[tag].discard(slot)
+        self.ids[slot] = sys.intern(node.id) if isinstance(node.id, str) else node.id
+        self.names[slot] = sys.intern(node.name) if isinstance(node.name, str) else node.name
+        self._tags[slot] = tags
+        for tag in node.tags or ():
+            self.tag_index[tag].add(slot)
+        self._type[slot] = self._type_code(node.type)
+        self._recall[slot] = node.recall_strength
+        self._updated[slot] = time.time() if updated_at is None else updated_at
+
+    def _grow(self):
+        capacity = max(64, 2 * len(self._recall))
+        for name in ("_recall", "_type", "_updated", "_text_rev"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+
+    def append(self, node, updated_at=None):
+        if self._size == len(self._recall):
+            self._grow()
+        slot = self._size
+        self._size += 1
+        self.ids.append(None)
+        self.names.append(None)
+        self._tags.append(None)
+        self._write(slot, node, updated_at)
+        return slot
+
+    def set_recall(self, values, slots=None, updated_at=None):
+        """Bulk-writes recall_strength for every node (or just `slots`) and stamps them with `updated_at` (default: now)."""
+        target = slice(None) if slots is None else slots
+        self._recall[:self._size][target] = values
+        self._updated[:self._size][target] = time.time() if updated_at is None else updated_at
+
+    # Live, read-only column views
+    @staticmethod
+    def _read_only(column):
+        column.flags.writeable = False
+        return column
+
+    @property
+    def recall_strength(self):
+        return self._read_only(self._recall[:self._size])
+
+    @property
+    def type_codes(self):
+        return self._read_only(self._type[:self._size])
+
+    @property
+    def updated_at(self):
+        return self._read_only(self._updated[:self._size])
+
+    @property
+    def text_revision(self):
+        return self._read_only(self._text_rev[:self._size])
+
+    def type_mask(self, type_name):
+        code = self._type_codes.get(type_name)
+        if code is None:
+            return np.zeros(self._size, dtype=bool)
+        return self.type_codes == code
+
+    def tag_slots(self, tag):
+        return np.fromiter(sorted(self.tag_index.get(tag, ())), dtype=np.int64)
+
 class MemoryAccess:
-    def __init__(self, filename):
+    """
+    In-memory view of a memory bank JSON file.
+
+    Changes are tracked instead of written immediately. Each change is
+    appended to a small delta journal (<filename>.journal) so it survives a
+    crash, and the full bank is rewritten atomically only when
+    `flush_threshold` changes have accumulated or `flush_interval` seconds
+    have passed. `load_data` replays any journal left by an unflushed run and cuts off
+    a torn final delta, so new deltas always follow a complete line.
+    Call `flush()` (or `close()`) to force a write.
+    """
+
+    def __init__(self, filename, flush_interval=5.0, flush_threshold=50, journal=True):
         self.filename = filename
-        self.nodes = []
+        self.journal_path = filename + ".journal" if journal else None
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.nodes = NodeStore()
         self.links = []
+        self._dirty_nodes = set()
+        self._dirty_links = 0
+        self._pending_changes = 0
+        self._last_flush = time.monotonic()
+        self._journal_file = None
+        # Indexes kept in step with nodes/links:
+        #   _slots:    node id -> position in self.nodes
+        #   _heap:     max-heap of (-recall_strength, slot), stale entries skipped lazily
+        #   _outgoing: source id -> positions in self.links
+        #   _incoming: target id -> positions in self.links
+        #   _link_positions: (source, target) -> position in self.links
+        self._slots = {}
+        self._heap = []
+        self._outgoing = defaultdict(list)
+        self._incoming = defaultdict(list)
+        self._link_positions = {}
         self.load_data()
 
     def load_data(self):
         with open(self.filename, "r", encoding='utf-8') as file:
             data = json.load(file)
 
-        self.nodes = [
-            Node(
-                **{
-                    "id": node["id"],
-                    "name": node["name"],
-                    "type": node["type"],
-                    "tags": node.get("tags", []),
-                    "recall_strength": node.get("recall_strength", 0.5)
-                }
-            )
-            for node in data.get("nodes", [])
-        ]
-
+        self.nodes = NodeStore(capacity=max(64, len(data.get("nodes", []))))
+        for node in data.get("nodes", []):
+            # Banks written before timestamps were persisted start their clock now
+            self.nodes.append(_node_from_dict(node), node.get("updated_at"))
         self.links = [Link(**link) for link in data.get("links", [])]
+        self._build_indexes()
+        self._dirty_nodes = set()
+        self._dirty_links = 0
+        self._pending_changes = 0
+        self._replay_journal()
+
+    def _replay_journal(self):
+        if not self.journal_path or not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "r+b") as file:
+            intact = 0
+            for line in file:
+                try:
+                    delta = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    break  # torn final write; everything before it is intact
+                if delta.get("op") == "node":
+                    node = delta["node"]
+                    self._dirty_nodes.add(self._apply_node(_node_from_dict(node), node.get("updated_at")))
+                elif delta.get("op") == "link":
+                    self._apply_link(Link(**delta["link"]))
+                    self._dirty_links += 1
+                self._pending_changes += 1
+                intact += len(line)
+                if not line.endswith(b"\n"):
+                    # Complete delta whose newline never made it; terminate it before new ones are appended
+                    file.seek(intact)
+                    file.write(b"\n")
+                    intact += 1
+                    break
+            # Drop a torn tail, so later deltas are not appended behind a line that can't be read back
+            file.seek(intact)
+            file.truncate()
+
+    def _build_indexes(self):
+        self._slots = {node_id: slot for slot, node_id in enumerate(self.nodes.ids)}
+        self._rebuild_heap()
+        self._outgoing = defaultdict(list)
+        self._incoming = defaultdict(list)
+        self._link_positions = {}
+        for position, link in enumerate(self.links):
+            self._outgoing[link.source].append(position)
+            self._incoming[link.target].append(position)
+            self._link_positions.setdefault((link.source, link.target), position)
+
+    def _rebuild_heap(self):
+        self._heap = list(zip((-self.nodes.recall_strength).tolist(), range(len(self.nodes))))
+        heapq.heapify(self._heap)
+
+    def _push_recall(self, slot):
+        heapq.heappush(self._heap, (-float(self.nodes.recall_strength[slot]), slot))
+        # Stale entries are skipped on read; rebuild once they dominate the heap.
+        if len(self._heap) > 2 * len(self.nodes) + 16:
+            self._rebuild_heap()
 
     def save_data(self):
+        """Atomically rewrites the whole bank (temp file + rename) and clears the journal."""
         data = {
-            "nodes": [node._asdict() for node in self.nodes],
+            "nodes": [self.nodes.as_dict(slot) for slot in range(len(self.nodes))],
             "links": [link._asdict() for link in self.links]
         }
-        with open(self.filename, "w", encoding='utf-8') as file:
+        tmp_path = self.filename + ".tmp"
+        with open(tmp_path, "w", encoding='utf-8') as file:
             json.dump(data, file, indent=4, ensure_ascii=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.filename)
+
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+        if self.journal_path and os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._dirty_nodes.clear()
+        self._dirty_links = 0
+        self._pending_changes = 0
+        self._last_flush = time.monotonic()
+
+    @property
+    def dirty(self):
+        return bool(self._dirty_nodes) or self._dirty_links > 0
+
+    def flush(self):
+        if self.dirty:
+            self.save_data()
+
+    def maybe_flush(self):
+        """Flushes if enough changes have accumulated or the flush interval has elapsed."""
+        if not self._pending_changes:
+            return False
+        if self._pending_changes >= self.flush_threshold or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.save_data()
+            return True
+        return False
+
+    def close(self):
+        self.flush()
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+
+    def _journal(self, delta):
+        if not self.journal_path:
+            return
+        if self._journal_file is None:
+            self._journal_file = open(self.journal_path, "a", encoding='utf-8')
+        self._journal_file.write(json.dumps(delta, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._journal_file.flush()
+
+    def _record_node(self, slot):
+        self._dirty_nodes.add(slot)
+        self._pending_changes += 1
+        self._journal({"op": "node", "node": self.nodes.as_dict(slot)})
+        self.maybe_flush()
+
+    def _record_link(self, link):
+        self._dirty_links += 1
+        self._pending_changes += 1
+        self._journal({"op": "link", "link": link._asdict()})
+        self.maybe_flush()
+
+    def get_node(self, node_id):
+        slot = self._slots.get(node_id)
+        return self.nodes[slot] if slot is not None else None
+
+    def slot(self, node_id):
+        """Returns the node's position in self.nodes (and its column arrays), or None."""
+        return self._slots.get(node_id)
+
+    def _apply_node(self, node, updated_at=None):
+        slot = self._slots.get(node.id)
+        if slot is None:
+            slot = len(self.nodes)
+            self.nodes.append(node, updated_at)
+            self._slots[node.id] = slot
+        else:
+            self.nodes.write(slot, node, updated_at)
+        self._push_recall(slot)
+        return slot
+
+    def _apply_link(self, link):
+        position = self._link_positions.get((link.source, link.target))
+        if position is not None:
+            self.links[position] = link
+            return
+        position = len(self.links)
+        self.links.append(link)
+        self._outgoing[link.source].append(position)
+        self._incoming[link.target].append(position)
+        self._link_positions[(link.source, link.target)] = position
+
+    def add_node(self, node):
+        """Adds a Node, or replaces the existing node with the same id."""
+        self._record_node(self._apply_node(node))
+        return node
+
+    def add_link(self, link):
+        """Adds a Link, or replaces the existing link between the same source and target."""
+        self._apply_link(link)
+        self._record_link(link)
+        return link
+
+    def get_link(self, source, target):
+        position = self._link_positions.get((source, target))
+        return self.links[position] if position is not None else None
+
+    # Extraction output may use the graph format (nodes/links) or Agent P's
+    # entity format (people/events/locations/connections); section -> node type.
+    MERGE_NODE_SECTIONS = {"nodes": "memory", "people": "person", "events": "event", "locations": "location"}
+    MERGE_LINK_SECTIONS = ("links", "connections")
+
+    @staticmethod
+    def _merge_fields(raw, section_type):
+        """Normalizes one extracted entity to Node fields; returns None if it has no usable id."""
+        if not isinstance(raw, dict) or raw.get("id") in (None, ""):
+            return None
+        fields = {"id": raw["id"]}
+        name = raw.get("name") or raw.get("description")
+        if name:
+            fields["name"] = str(name)
+        fields["type"] = raw.get("type") or section_type
+        tags = raw.get("tags")
+        if isinstance(tags, list):
+            fields["tags"] = tags
+        try:
+            if raw.get("recall_strength") is not None:
+                fields["recall_strength"] = float(raw["recall_strength"])
+        except (TypeError, ValueError):
+            pass
+        return fields
+
+    def merge(self, memory):
+        """
+        Merges an extracted memory into the bank. Both the graph format
+        ({"nodes": [...], "links": [...]}) and Agent P's entity format
+        ({"people"/"events"/"locations": [...], "connections": [...]}) are read.
+
+        New nodes and links are added; for ones already present only changed
+        fields are applied (recall_strength, tags, name / link strength), so
+        the cost is proportional to the size of the memory, not the bank.
+        Entries without an id (or links without both ends) are skipped.
+        Every change goes through the journal. Returns counts of what changed.
+        """
+        counts = {"nodes_added": 0, "nodes_updated": 0, "links_added": 0, "links_updated": 0, "skipped": 0}
+        for section, section_type in self.MERGE_NODE_SECTIONS.items():
+            for raw in memory.get(section, []) or []:
+                fields = self._merge_fields(raw, section_type)
+                if fields is None:
+                    print(f"Skipping malformed {section} entry: {raw}")
+                    counts["skipped"] += 1
+                    continue
+                existing = self.get_node(fields["id"])
+                if existing is None:
+                    fields.setdefault("name", str(fields["id"]))
+                    self.add_node(_node_from_dict(fields))
+                    counts["nodes_added"] += 1
+                    continue
+                # The section-derived type only fills in new nodes; it never retypes an existing one
+                if "type" not in raw:
+                    fields.pop("type")
+                changes = {field: value for field, value in fields.items()
+                           if field != "id" and value != getattr(existing, field)}
+                if changes:
+                    self.add_node(existing._replace(**changes))
+                    counts["nodes_updated"] += 1
+
+        for section in self.MERGE_LINK_SECTIONS:
+            for raw in memory.get(section, []) or []:
+                if not isinstance(raw, dict) or raw.get("source") is None or raw.get("target") is None:
+                    print(f"Skipping malformed {section} entry: {raw}")
+                    counts["skipped"] += 1
+                    continue
+                # Agent output names the weight recall_strength, as the node fields do
+                strength = raw.get("strength", raw.get("recall_strength"))
+                existing = self.get_link(raw["source"], raw["target"])
+                if existing is None:
+                    self.add_link(Link(raw["source"], raw["target"], strength))
+                    counts["links_added"] += 1
+                elif strength is not None and strength != existing.strength:
+                    self.add_link(existing._replace(strength=strength))
+                    counts["links_updated"] += 1
+        return counts
+
+    def get_links_from(self, node_id):
+        return [self.links[position] for position in self._outgoing.get(node_id, [])]
+
+    def get_links_to(self, node_id):
+        return [self.links[position] for position in self._incoming.get(node_id, [])]
+
+    def neighbors(self, node_id):
+        """Returns the ids of nodes linked to node_id in either direction."""
+        seen = {}
+        for link in self.get_links_from(node_id):
+            seen.setdefault(link.target, None)
+        for link in self.get_links_to(node_id):
+            seen.setdefault(link.source, None)
+        return list(seen)
 
     def get_highest_recall_memories(self, top_n=2):
-        sorted_nodes = sorted(self.nodes, key=lambda node: node.recall_strength, reverse=True)
-        return sorted_nodes[:top_n]
+        # Pop from the heap until top_n live entries are found, then restore them.
+        popped = []
+        result = []
+        seen = set()
+        strengths = self.nodes.recall_strength
+        while self._heap and len(result) < top_n:
+            entry = heapq.heappop(self._heap)
+            popped.append(entry)
+            neg_strength, slot = entry
+            if slot in seen or strengths[slot] != -neg_strength:
+                continue
+            seen.add(slot)
+            result.append(self.nodes[slot])
+        for entry in popped:
+            neg_strength, slot = entry
+            if strengths[slot] == -neg_strength:
+                heapq.heappush(self._heap, entry)
+        return result
     
     def increase_recall(self, node_id):
-        for idx, node in enumerate(self.nodes):
-            if node.id == node_id:
-                # Increase recall_strength by 0.1, ensuring it doesn't exceed 1.0
-                new_strength = min(node.recall_strength + 0.1, 1.0)
-                # Create a new Node with the updated recall_strength
-                self.nodes[idx] = node._replace(recall_strength=new_strength)
-                print(f"Updated node {node_id}: recall_strength from {node.recall_strength} to {new_strength}")
-                break
-        else:
+        slot = self._slots.get(node_id)
+        if slot is None:
             print(f"Node with id {node_id} not found.")
+            return
+        node = self.nodes[slot]
+        # Increase recall_strength by 0.1, ensuring it doesn't exceed 1.0
+        new_strength = min(node.recall_strength + 0.1, 1.0)
+        # Create a new Node with the updated recall_strength
+        self.nodes.write(slot, node._replace(recall_strength=new_strength))
+        self._push_recall(slot)
+        self._record_node(slot)
+        print(f"Updated node {node_id}: recall_strength from {node.recall_strength} to {new_strength}")
+
+    # ---------------------------------
+    # Vectorized bulk operations
+    # ---------------------------------
+    def _bulk_updated(self, strengths, slots=None):
+        self.nodes.set_recall(strengths, slots)
+        self._rebuild_heap()
+        # A whole-bank change is cheaper to persist as one snapshot than as per-node deltas.
+        self.save_data()
+
+    def decay_all(self, factor=None, half_life=None, floor=0.0):
+        """
+        Decays every node's recall_strength in one array operation, either by a
+        fixed `factor` or by elapsed time since each node's last update
+        (strength halves every `half_life` seconds). Values never drop below `floor`.
+        """
+        if half_life is not None:
+            elapsed = time.time() - self.nodes.updated_at
+            strengths = self.nodes.recall_strength * np.power(0.5, elapsed / half_life)
+        elif factor is not None:
+            strengths = self.nodes.recall_strength * factor
+        else:
+            raise ValueError("decay_all needs a factor or a half_life.")
+        np.maximum(strengths, floor, out=strengths)
+        self._bulk_updated(strengths)
+
+    def boost_by_tag(self, tag, amount=0.1, cap=1.0):
+        """Raises recall_strength for every node carrying `tag`; returns how many were boosted."""
+        slots = self.nodes.tag_slots(tag)
+        if not len(slots):
+            return 0
+        self._bulk_updated(np.minimum(self.nodes.recall_strength[slots] + amount, cap), slots)
+        return len(slots)
+
+    def recall_percentile(self, q, node_type=None):
+        """Returns the q-th percentile (0-100) of recall_strength, optionally for one node type."""
+        strengths = self.nodes.recall_strength
+        if node_type is not None:
+            strengths = strengths[self.nodes.type_mask(node_type)]
+        return float(np.percentile(strengths, q)) if len(strengths) else None
+
+    def nodes_above_percentile(self, q, node_type=None):
+        threshold = self.recall_percentile(q, node_type)
+        if threshold is None:
+            return []
+        mask = self.nodes.recall_strength >= threshold
+        if node_type is not None:
+            mask &= self.nodes.type_mask(node_type)
+        return [self.nodes[int(slot)] for slot in np.flatnonzero(mask)]
 
 if __name__ == "__main__":
     json_filename = "C:/repos/memory-bridge/frontend/src/data.json" 
@@ -1,10 +1,11 @@
-import pandas as pd
 import json
+import numpy as np
 import networkx as nx
 import matplotlib.pyplot as plt
-import matplotlib.animation as animation
 import seaborn as sns
+import hashlib
 import os
+import random
 from datetime import datetime
 
 file_path = "memory_bank.json"  # Change this to the actual path if needed
@@ -20,86 +21,90 @@ def load_data():
     except (FileNotFoundError, json.JSONDecodeError):
         return None
 
+# (JSON section, node type, label builder) for each node category
+NODE_SECTIONS = (
+    ("people", "person", lambda entry: f"{entry['name']} ({entry.get('relationship', '')})"),
+    ("events", "event", lambda entry: entry["description"]),
+    ("locations", "location", lambda entry: entry["name"]),
+)
+
 def create_graph(data):
     """
     Builds and returns a NetworkX graph (G) along with node_colors, node_sizes, and node_labels.
     """
-    # Convert each node category (people, events, locations) into DataFrames
-    df_people = pd.DataFrame(data.get("people", []))
-    df_events = pd.DataFrame(data.get("events", []))
-    df_locations = pd.DataFrame(data.get("locations", []))
-    
-    # Tag each node type for coloring/labeling
-    if not df_people.empty:
-        df_people["type"] = "person"
-        df_people["label"] = df_people["name"] + " (" + df_people["relationship"] + ")"
-    if not df_events.empty:
-        df_events["type"] = "event"
-        df_events["label"] = df_events["description"]
-    if not df_locations.empty:
-        df_locations["type"] = "location"
-        df_locations["label"] = df_locations["name"]
-    
-    # Combine all node data into a single DataFrame
-    all_nodes = pd.concat([df_people, df_events, df_locations], ignore_index=True, sort=False)
-    
-    # Create the graph
-    G = nx.Graph()
-    
     # Define color mapping for each node type
     color_map = {
         "person": sns.color_palette("coolwarm", 3)[1],    # or pick a color you like
         "event": sns.color_palette("coolwarm", 3)[0],
         "location": sns.color_palette("coolwarm", 3)[2]
     }
-    
+
+    G = nx.Graph()
     node_colors = {}
-    node_sizes = {}
     node_labels = {}
-    
-    # Add nodes to the graph
-    for _, row in all_nodes.iterrows():
-        node_id = row["id"]
-        node_type = row["type"]
-        recall_strength = row.get("recall_strength", 1)
-        label = row["label"]
-        
-        # Add the node to the graph
-        G.add_node(node_id, type=node_type)
-        
-        # Store label for drawing
-        node_labels[node_id] = label
-        
-        # Assign color and size
-        node_colors[node_id] = color_map.get(node_type, "gray")
-        node_sizes[node_id] = recall_strength * 600  # Tweak multiplier as you like
-    
-    # Add edges from the "connections" array
-    df_connections = pd.DataFrame(data.get("connections", []))
-    
-    for _, row in df_connections.iterrows():
-        source = row["source"]
-        target = row["target"]
-        edge_strength = row.get("recall_strength", 1)
-        
-        # Add edge with weight
-        G.add_edge(source, target, weight=edge_strength * 5)
-    
+    node_ids = []
+    recall_strengths = []
+
+    # Add each category's nodes in one call, straight from the JSON lists
+    for section, node_type, label in NODE_SECTIONS:
+        entries = data.get(section, [])
+        ids = [entry["id"] for entry in entries]
+        G.add_nodes_from(ids, type=node_type)
+        node_colors.update(dict.fromkeys(ids, color_map[node_type]))
+        node_labels.update(zip(ids, map(label, entries)))
+        node_ids.extend(ids)
+        recall_strengths.extend(entry.get("recall_strength", 1) for entry in entries)
+
+    sizes = np.asarray(recall_strengths, dtype=float) * 600  # Tweak multiplier as you like
+    node_sizes = dict(zip(node_ids, sizes.tolist()))
+
+    # Add edges from the "connections" array, weighted by recall strength
+    connections = data.get("connections", [])
+    weights = np.asarray([connection.get("recall_strength", 1) for connection in connections], dtype=float) * 5
+    G.add_weighted_edges_from(zip(
+        (connection["source"] for connection in connections),
+        (connection["target"] for connection in connections),
+        weights.tolist()
+    ))
+
     return G, node_colors, node_sizes, node_labels
 
-def draw_graph(ax, G, node_colors, node_sizes, node_labels):
+def layout_graph(G, previous_pos=None):
+    """
+    Returns node positions for G, warm-started from previous_pos.
+
+    Nodes that already had a position keep it; only new nodes are placed,
+    starting next to the average position of their placed neighbours.
+    """
+    previous_pos = previous_pos or {}
+    pos = {node: previous_pos[node] for node in G if node in previous_pos}
+    if len(pos) == len(G):
+        return pos
+    if not pos:
+        # Increase spacing using `k` parameter (higher values spread nodes out)
+        return nx.spring_layout(G, seed=42, k=.5, scale=1.5)
+
+    fixed = list(pos)
+    rng = random.Random(42)
+    for node in G:
+        if node in pos:
+            continue
+        anchors = [pos[neighbor] for neighbor in G.neighbors(node) if neighbor in previous_pos]
+        if anchors:
+            x = sum(p[0] for p in anchors) / len(anchors)
+            y = sum(p[1] for p in anchors) / len(anchors)
+        else:
+            x, y = rng.uniform(-1.5, 1.5), rng.uniform(-1.5, 1.5)
+        pos[node] = (x + rng.uniform(-0.05, 0.05), y + rng.uniform(-0.05, 0.05))
+    return nx.spring_layout(G, pos=pos, fixed=fixed, seed=42, k=.5)
+
+def draw_graph(ax, G, node_colors, node_sizes, node_labels, pos):
     """
     Draws the graph with improved node spacing to reduce overlap.
     """
     ax.clear()
     ax.set_facecolor("black")  # Set background to black
 
-    # Increase spacing using `k` parameter (higher values spread nodes out)
-    pos = nx.spring_layout(G, seed=42, k=.5, scale=1.5)  
-
-    # Alternative: Kamada-Kawai layout (better for small graphs)
-    # pos = nx.kamada_kawai_layout(G)
-
     # Extract edge weights for edge thickness
     edge_weights = [G[u][v]['weight'] for u, v in G.edges()]
 
@@ -129,19 +134,66 @@ def draw_graph(ax, G, node_colors, node_sizes, node_labels):
     ax.axis("off")
 
 
-def update_graph(frame, ax):
+class GraphCache:
+    """
+    Keeps the last graph built from the memory bank, keyed by content version.
+
+    poll() only stats the file; it is read when its mtime or size changes,
+    and the graph is rebuilt (and laid out, warm-started from the previous
+    positions) only when the content hash differs from the cached version.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.version = None
+        self.graph = None
+        self.pos = {}
+        self._stat = None
+
+    def poll(self):
+        """Returns True if the graph changed since the last poll."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        if stat_key == self._stat:
+            return False
+
+        with open(self.path, "rb") as file:
+            raw = file.read()
+        version = hashlib.sha1(raw).hexdigest()
+        if version == self.version:
+            self._stat = stat_key
+            return False
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError:
+            return False  # caught mid-write; the next poll sees the finished file
+
+        self._stat = stat_key
+        self.version = version
+        self.graph = create_graph(data)
+        self.pos = layout_graph(self.graph[0], self.pos)
+        return True
+
+def refresh(ax, cache):
     """
-    Animation update function: reloads data and redraws the graph.
+    Timer callback: redraws only when the memory bank has changed.
     """
-    data = load_data()
-    if data:
-        G, node_colors, node_sizes, node_labels = create_graph(data)
-        draw_graph(ax, G, node_colors, node_sizes, node_labels)
+    if cache.poll():
+        G, node_colors, node_sizes, node_labels = cache.graph
+        draw_graph(ax, G, node_colors, node_sizes, node_labels, cache.pos)
+        ax.figure.canvas.draw_idle()
 
 if __name__ == "__main__":
     fig, ax = plt.subplots(figsize=(12, 10))
     fig.patch.set_facecolor("black")  # Ensure the figure background is black
-    
-    # Use FuncAnimation to periodically update the graph (e.g., every 2 seconds)
-    ani = animation.FuncAnimation(fig, update_graph, fargs=(ax,), interval=250)
+
+    # Check the file every 250 ms; a stat call is all an idle tick costs
+    cache = GraphCache(file_path)
+    refresh(ax, cache)
+    timer = fig.canvas.new_timer(interval=250)
+    timer.add_callback(refresh, ax, cache)
+    timer.start()
     plt.show()
@@ -1,5 +1,5 @@
-import pandas as pd
 import json
+import numpy as np
 import networkx as nx
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
@@ -17,45 +17,63 @@ def load_data():
         return None
 
 def create_graph(data):
-    df_people = pd.json_normalize(data, record_path=['people'])
-    df_events = pd.json_normalize(data, record_path=['events'])
-    df_locations = pd.json_normalize(data, record_path=['locations'])
-    
-    df_events = df_events.explode('related_people')
-    df_events[['person_id', 'person_recall_strength']] = pd.DataFrame(df_events['related_people'].tolist(), index=df_events.index)
-    df_events.drop(columns=['related_people'], inplace=True)
-    
-    df_merged = df_events.merge(df_people, left_on='person_id', right_on='id', how='left', suffixes=('_event', '_person'))
-    df_merged = df_merged.explode('related_places')
-    df_merged[['location_id', 'location_recall_strength']] = pd.DataFrame(df_merged['related_places'].tolist(), index=df_merged.index)
-    df_merged.drop(columns=['related_places'], inplace=True)
-    df_merged = df_merged.merge(df_locations, left_on='location_id', right_on='id', how='left', suffixes=('', '_location'))
-    
-    G = nx.Graph()
-    node_colors = {}
-    node_sizes = {}
-    color_palette = {"event": "#FF4500", "person": "#00CED1", "location": "#FFD700"}
+    people = {person["id"]: person for person in data.get("people", [])}
+    locations = {location["id"]: location for location in data.get("locations", [])}
+    events = data.get("events", [])
+
+    event_nodes = [event["description"] for event in events]
+    event_strengths = np.asarray([event.get("recall_strength", 1) for event in events], dtype=float)
 
-    for _, row in df_merged.iterrows():
-        event_node = f"{row['description_event']}"
-        person_node = f"{row['name']} ({row['relationship']})"
-        location_node = f"{row['name_location']}"
+    # Flatten the [id, recall_strength] pairs into one row per (event, person) and (event, place) edge
+    person_rows, person_edge_ids = [], []
+    place_rows, place_edge_ids, place_strengths = [], [], []
+    for row, event in enumerate(events):
+        for person_id, _ in event.get("related_people", []):
+            if person_id in people:
+                person_rows.append(row)
+                person_edge_ids.append(person_id)
+        for location_id, strength in event.get("related_places", []):
+            if location_id in locations:
+                place_rows.append(row)
+                place_edge_ids.append(location_id)
+                place_strengths.append(strength)
 
-        G.add_node(event_node, type="event")
-        G.add_node(person_node, type="person")
-        G.add_node(location_node, type="location")
+    # Only people and places some event refers to are drawn
+    person_ids = list(dict.fromkeys(person_edge_ids))
+    location_ids = list(dict.fromkeys(place_edge_ids))
+    person_label = {person_id: f"{people[person_id]['name']} ({people[person_id]['relationship']})" for person_id in person_ids}
+    location_label = {location_id: locations[location_id]["name"] for location_id in location_ids}
+    person_nodes = [person_label[person_id] for person_id in person_ids]
+    location_nodes = [location_label[location_id] for location_id in location_ids]
+
+    G = nx.Graph()
+    color_palette = {"event": "#FF4500", "person": "#00CED1", "location": "#FFD700"}
+    G.add_nodes_from(event_nodes, type="event")
+    G.add_nodes_from(person_nodes, type="person")
+    G.add_nodes_from(location_nodes, type="location")
 
-        node_colors[event_node] = color_palette["event"]
-        node_colors[person_node] = color_palette["person"]
-        node_colors[location_node] = color_palette["location"]
+    node_colors = dict.fromkeys(event_nodes, color_palette["event"])
+    node_colors.update(dict.fromkeys(person_nodes, color_palette["person"]))
+    node_colors.update(dict.fromkeys(location_nodes, color_palette["location"]))
 
-        node_sizes[event_node] = row.get('recall_strength_event', 1) * 800
-        node_sizes[person_node] = row.get('recall_strength_person', 1) * 600
-        node_sizes[location_node] = row.get('recall_strength', 1) * 700
+    person_strengths = np.asarray([people[person_id].get("recall_strength", 1) for person_id in person_ids], dtype=float)
+    location_strengths = np.asarray([locations[location_id].get("recall_strength", 1) for location_id in location_ids], dtype=float)
+    node_sizes = dict(zip(event_nodes, (event_strengths * 800).tolist()))
+    node_sizes.update(zip(person_nodes, (person_strengths * 600).tolist()))
+    node_sizes.update(zip(location_nodes, (location_strengths * 700).tolist()))
 
-        G.add_edge(event_node, person_node, weight=row.get('recall_strength_event', 1) * 5)
-        G.add_edge(event_node, location_node, weight=row.get('location_recall_strength', 1) * 5)
-    
+    # Event-person edges take the event's recall strength, event-place edges the place link's
+    person_rows = np.asarray(person_rows, dtype=int)
+    G.add_weighted_edges_from(zip(
+        (event_nodes[row] for row in person_rows.tolist()),
+        (person_label[person_id] for person_id in person_edge_ids),
+        (event_strengths[person_rows] * 5).tolist()
+    ))
+    G.add_weighted_edges_from(zip(
+        (event_nodes[row] for row in place_rows),
+        (location_label[location_id] for location_id in place_edge_ids),
+        (np.asarray(place_strengths, dtype=float) * 5).tolist()
+    ))
     return G, node_colors, node_sizes
 
 def draw_graph(ax, G, node_colors, node_sizes):
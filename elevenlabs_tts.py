@@ -1,32 +1,74 @@
 # elevenlabs_tts.py
-import requests
+from typing import AsyncIterator
+from http_clients import create_async_client
 
 class ElevenLabsTTS:
-    def __init__(self, api_key: str, voice_id: str):
+    def __init__(self, api_key: str, voice_id: str, base_url: str = "https://api.elevenlabs.io",
+                 max_connections: int = 20, timeout: float = 60.0, http_client=None, voice_settings: dict = None):
         """
         :param api_key: Your ElevenLabs API key
         :param voice_id: The ID of the cloned voice from ElevenLabs
+        :param base_url: API root; point this at a local fake server for testing
+        :param max_connections: Size of the keep-alive connection pool
+        :param timeout: Per-request timeout in seconds
+        :param http_client: Optional shared httpx.AsyncClient (not closed by aclose)
+        :param voice_settings: ElevenLabs voice_settings payload
         """
         self.api_key = api_key
         self.voice_id = voice_id
+        self.base_url = base_url.rstrip("/")
+        self.voice_settings = voice_settings or {"stability": 0.5, "similarity_boost": 0.5}
+        self._owns_http_client = http_client is None
+        self.http_client = http_client or create_async_client(max_connections=max_connections, timeout=timeout)
 
-    def synthesize_speech(self, text: str) -> bytes:
-        """
-        Calls ElevenLabs TTS API to convert `text` into an MP3 in your cloned voice.
-        Returns the MP3 bytes.
-        """
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{self.voice_id}"
+    def _request_args(self, text: str):
         headers = {
             "xi-api-key": self.api_key,
             "Content-Type": "application/json"
         }
         payload = {
             "text": text,
-            "voice_settings": {
-                "stability": 0.5,
-                "similarity_boost": 0.5
-            }
+            "voice_settings": self.voice_settings
         }
-        response = requests.post(url, json=payload, headers=headers)
+        return headers, payload
+
+    async def synthesize_speech(self, text: str) -> bytes:
+        """
+        Calls ElevenLabs TTS API to convert `text` into an MP3 in your cloned voice.
+        Returns the MP3 bytes.
+        """
+        url = f"{self.base_url}/v1/text-to-speech/{self.voice_id}"
+        headers, payload = self._request_args(text)
+        response = await self.http_client.post(url, json=payload, headers=headers)
         response.raise_for_status()  # raises error if request failed
         return response.content  # MP3 bytes
+
+    async def stream_speech(self, text: str, chunk_size: int = 4096) -> AsyncIterator[bytes]:
+        """
+        Opens a streaming synthesis request and returns an async iterator of MP3 chunks.
+        The request is made (and its status checked) before returning, so upstream
+        errors surface here rather than halfway through the client's response.
+        """
+        url = f"{self.base_url}/v1/text-to-speech/{self.voice_id}/stream"
+        headers, payload = self._request_args(text)
+        request = self.http_client.build_request("POST", url, json=payload, headers=headers)
+        response = await self.http_client.send(request, stream=True)
+        try:
+            response.raise_for_status()
+        except Exception:
+            await response.aclose()
+            raise
+
+        async def iter_chunks():
+            try:
+                async for chunk in response.aiter_bytes(chunk_size):
+                    if chunk:
+                        yield chunk
+            finally:
+                await response.aclose()
+
+        return iter_chunks()
+
+    async def aclose(self):
+        if self._owns_http_client:
+            await self.http_client.aclose()
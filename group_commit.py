@@ -0,0 +1,197 @@
+# group_commit.py
+
+import asyncio
+import json
+import os
+from typing import Any, Callable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# -------------------------------------
+# Cross-process file lock
+# -------------------------------------
+class FileLock:
+    """Exclusive lock on `<path>.lock`, so writers in other worker processes take turns."""
+
+    def __init__(self, path: str):
+        self.path = path + ".lock"
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+# -------------------------------------
+# JsonDocumentFile Class
+# -------------------------------------
+class JsonDocumentFile:
+    """
+    A {root_key: [records...]} JSON document that is appended to in batches.
+
+    The document is kept in memory and each `commit(records)` appends the
+    whole batch, then replaces the file atomically (temp file + fsync +
+    rename): one rewrite and one fsync per batch, and a crash leaves either
+    the old or the new document, never a torn one. The file is re-read only
+    when another process has changed it since our last write.
+    """
+
+    def __init__(self, path: str, root_key: str):
+        self.path = path
+        self.root_key = root_key
+        self._data = None
+        self._stat = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _file_stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {self.root_key: []}
+        if not isinstance(data, dict):
+            data = {self.root_key: []}
+        if self.root_key not in data or not isinstance(data[self.root_key], list):
+            data[self.root_key] = []
+        self._data = data
+
+    def commit(self, records: List[dict]) -> List[int]:
+        """Appends the batch and persists it; returns each record's index in the list."""
+        with FileLock(self.path):
+            if self._data is None or self._file_stat() != self._stat:
+                self._load()
+            items = self._data[self.root_key]
+            start = len(items)
+            items.extend(records)
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self._data, f, indent=4, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                del items[start:]
+                raise
+            self._stat = self._file_stat()
+            return list(range(start, start + len(records)))
+
+# -------------------------------------
+# GroupCommitWriter Class
+# -------------------------------------
+class GroupCommitWriter:
+    """
+    Single writer task that owns one data file.
+
+    `submit(record)` queues the record and waits for its acknowledgement.
+    The writer takes everything queued, waiting at most `max_delay` seconds
+    for the batch to reach `max_batch` records, then hands the whole batch
+    to `commit(records)` in a worker thread. `commit` must persist the
+    batch (one fsync) and return one result per record. Each submitter gets
+    its record's result, or the exception if the batch failed.
+    """
+
+    def __init__(self, commit: Callable[[List[Any]], Optional[List[Any]]],
+                 max_batch: int = 64, max_delay: float = 0.01):
+        self.commit = commit
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"records": 0, "batches": 0, "failed_batches": 0}
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def submit(self, record: Any) -> Any:
+        """Queues one record and returns its result once the batch holding it is durable."""
+        if self._task is None:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((record, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            records = [record for record, _ in batch]
+            try:
+                results = await asyncio.to_thread(self.commit, records)
+            except Exception as e:
+                self.stats["failed_batches"] += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                if results is None:
+                    results = [None] * len(batch)
+                self.stats["records"] += len(batch)
+                self.stats["batches"] += 1
+                for (_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def close(self):
+        """Waits for every queued record to be committed, then stops the writer."""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
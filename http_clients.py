@@ -0,0 +1,17 @@
+# http_clients.py
+
+import httpx
+
+def create_async_client(max_connections: int = 20, max_keepalive_connections: int = None,
+                        timeout: float = 60.0, keepalive_expiry: float = 30.0) -> httpx.AsyncClient:
+    """
+    Builds a keep-alive httpx.AsyncClient meant to live for the whole app
+    lifetime, so repeated calls reuse pooled TLS connections instead of
+    paying connection setup on every request.
+    """
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections if max_keepalive_connections is not None else max_connections,
+        keepalive_expiry=keepalive_expiry
+    )
+    return httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(timeout))
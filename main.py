@@ -9,62 +9,139 @@ import json
 import asyncio
 from datetime import datetime
 import os
-import tempfile
 import io
-import subprocess  # for ffmpeg conversion
-import requests
+import uuid
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 load_dotenv()  # Load environment variables from .env if present
 
 # Import your existing code
-from orchestration import TherapyAgents, Session, SessionAggregator, append_session_log
+from orchestration import TherapyAgents, Session
+from session_log import get_session_log_store
 from voice import VoiceManager  # your VoiceManager that calls OpenAI Whisper
-
-########################################
-# ElevenLabs TTS Class
-########################################
-class ElevenLabsTTS:
-    def __init__(self, api_key: str, voice_id: str):
-        self.api_key = api_key
-        self.voice_id = voice_id
-
-    def synthesize_speech(self, text: str) -> bytes:
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{self.voice_id}"
-        headers = {
-            "xi-api-key": self.api_key,
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "text": text,
-            "voice_settings": {"stability": 0.5, "similarity_boost": 0.5}
-        }
-        response = requests.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-        return response.content  # MP3 bytes
+from elevenlabs_tts import ElevenLabsTTS
+from tts_cache import TTSCache, CachedTTS
+from session_store import SessionStore
+from group_commit import GroupCommitWriter, JsonDocumentFile
 
 ########################################
 # FFmpeg Conversion Helper
 ########################################
-def convert_to_wav(input_path: str, output_path: str):
-    # Check if the input file is empty
-    if os.stat(input_path).st_size == 0:
-        raise Exception(f"Input file {input_path} is empty. Recording might have failed.")
-
-    result = subprocess.run(
-        ["ffmpeg", "-y", "-f", "webm", "-i", input_path, "-vn", "-acodec", "pcm_s16le", output_path],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
-    )
-    if result.returncode != 0:
-        raise Exception(f"ffmpeg conversion failed:\nSTDOUT: {result.stdout}\nSTDERR: {result.stderr}")
-    return output_path
+class FFmpegConverter:
+    """
+    Converts WebM audio to WAV by piping bytes through ffmpeg's stdin/stdout,
+    so no temp files are written or re-read. At most `max_processes` ffmpeg
+    processes run at once; extra requests wait for a free slot.
+    """
+
+    def __init__(self, max_processes: int = 4, timeout: float = 30.0):
+        self.max_processes = max_processes
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max_processes)
+
+    async def convert_to_wav(self, webm_data: bytes) -> bytes:
+        if not webm_data:
+            raise Exception("Input audio is empty. Recording might have failed.")
+
+        async with self._slots:
+            process = await asyncio.create_subprocess_exec(
+                "ffmpeg", "-y", "-f", "webm", "-i", "pipe:0",
+                "-vn", "-acodec", "pcm_s16le", "-f", "wav", "pipe:1",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(webm_data), self.timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                raise Exception(f"ffmpeg conversion timed out after {self.timeout} seconds")
+
+        if process.returncode != 0:
+            raise Exception(f"ffmpeg conversion failed:\nSTDERR: {stderr.decode('utf-8', errors='replace')}")
+        return stdout
 
 ########################################
 # FastAPI App
 ########################################
-app = FastAPI()
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "60"))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join("data", "tts_cache"))
+TTS_CACHE_MEMORY_MB = int(os.getenv("TTS_CACHE_MEMORY_MB", "32"))
+TTS_CACHE_DISK_MB = int(os.getenv("TTS_CACHE_DISK_MB", "512"))
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join("data", "sessions.db"))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(6 * 3600)))
+SESSION_MAX_RESIDENT = int(os.getenv("SESSION_MAX_RESIDENT", "256"))
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "300"))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "64"))
+WRITE_BATCH_DELAY = float(os.getenv("WRITE_BATCH_DELAY", "0.01"))
+
+# App-lifetime clients, created at startup and shared by every request
+voice_manager: Optional[VoiceManager] = None
+tts: Optional[CachedTTS] = None
+session_store: Optional[SessionStore] = None
+# One group-commit writer per data file; endpoints submit records and await the ack
+feedback_writer: Optional[GroupCommitWriter] = None
+session_log_writer: Optional[GroupCommitWriter] = None
+
+async def sweep_sessions():
+    """Periodically expires old sessions and spills idle ones out of memory."""
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+        await session_store.sweep()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global voice_manager, tts, session_store, feedback_writer, session_log_writer
+    voice_manager = VoiceManager(
+        openai_api_key=os.getenv("OPENAI_API_KEY", "YOUR_OPENAI_KEY"),
+        max_connections=HTTP_POOL_SIZE,
+        timeout=HTTP_TIMEOUT
+    )
+    elevenlabs = ElevenLabsTTS(
+        api_key=os.getenv("ELEVENLABS_API_KEY", "YOUR_ELEVENLABS_KEY"),
+        voice_id=os.getenv("ELEVENLABS_VOICE_KEY", "YOUR_CLONED_VOICE_ID"),
+        base_url=os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io"),
+        max_connections=HTTP_POOL_SIZE,
+        timeout=HTTP_TIMEOUT
+    )
+    tts_cache = TTSCache(
+        directory=TTS_CACHE_DIR or None,
+        memory_max_bytes=TTS_CACHE_MEMORY_MB * 1024 * 1024,
+        disk_max_bytes=TTS_CACHE_DISK_MB * 1024 * 1024
+    )
+    tts = CachedTTS(elevenlabs, tts_cache)
+    session_store = SessionStore(
+        path=SESSION_DB_PATH,
+        ttl_seconds=SESSION_TTL_SECONDS,
+        max_resident=SESSION_MAX_RESIDENT,
+        idle_seconds=SESSION_IDLE_SECONDS
+    )
+    sweeper = asyncio.create_task(sweep_sessions())
+    feedback_writer = GroupCommitWriter(
+        JsonDocumentFile(os.path.join("data", "expert_feedback.json"), "feedbacks").commit,
+        max_batch=WRITE_BATCH_SIZE,
+        max_delay=WRITE_BATCH_DELAY
+    ).start()
+    session_log_writer = GroupCommitWriter(
+        get_session_log_store().append_many,
+        max_batch=WRITE_BATCH_SIZE,
+        max_delay=WRITE_BATCH_DELAY
+    ).start()
+    try:
+        yield
+    finally:
+        sweeper.cancel()
+        await feedback_writer.close()
+        await session_log_writer.close()
+        await voice_manager.aclose()
+        await tts.aclose()
+        session_store.close()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -84,11 +161,24 @@ def get_weekly_performance():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading weekly_performance.json: {str(e)}")
 
+@app.get("/tts_cache_stats")
+def get_tts_cache_stats():
+    return tts.cache.get_stats()
+
+@app.get("/session_store_stats")
+def get_session_store_stats():
+    return session_store.get_stats()
+
 ########################################
 # Therapy Setup
 ########################################
-therapy_agents = TherapyAgents()
-session_states: Dict[str, SessionAggregator] = {}
+therapy_agents = TherapyAgents(max_concurrency=int(os.getenv("AGENT_MAX_CONCURRENCY", "8")))
+audio_converter = FFmpegConverter(max_processes=int(os.getenv("FFMPEG_MAX_PROCESSES", "4")))
+TTS_STREAMING = os.getenv("TTS_STREAMING", "1").lower() not in ("0", "false", "no")
+
+def new_session_id():
+    # Timestamp for readability, random suffix so sessions started in the same second stay apart
+    return f"session_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
 
 ########################################
 # Pydantic Models
@@ -119,33 +209,12 @@ class PilotFeedback(BaseModel):
     prompt: str
     ai_responses: List[FeedbackItem]
 
-########################################
-# Helper: append_to_file
-########################################
-async def append_to_file(new_data: dict, file_path: str, root_key: str):
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        data = {root_key: []}
-
-    if root_key not in data or not isinstance(data[root_key], list):
-        data[root_key] = []
-
-    data[root_key].append(new_data)
-
-    await asyncio.to_thread(
-        lambda: json.dump(data, open(file_path, "w", encoding="utf-8"), indent=4, ensure_ascii=False)
-    )
-    return "Data appended successfully."
-
 ########################################
 # /start_session endpoint
 ########################################
 @app.post("/start_session", response_model=StartSessionResponse)
 async def start_session(data: PromptRequest):
-    session_id = f"session_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
-    aggregator = SessionAggregator(session_id, data.patient_id)
+    session_id = new_session_id()
     session_obj = Session(therapy_agents)
     responses = await session_obj.generate_multiple_responses("srt_agent", data.prompt, 3)
     single_segment = {
@@ -159,8 +228,7 @@ async def start_session(data: PromptRequest):
         ],
         "chosen_response": None
     }
-    aggregator.add_dialogue_segment(single_segment)
-    session_states[session_id] = aggregator
+    await session_store.create(session_id, data.patient_id, lambda aggregator: aggregator.add_dialogue_segment(single_segment))
     return {
         "session_id": session_id,
         "prompt": data.prompt,
@@ -174,13 +242,16 @@ async def start_session(data: PromptRequest):
 ########################################
 @app.post("/submit_feedback")
 async def submit_feedback(feedback: PilotFeedback):
-    aggregator = session_states.get(feedback.session_id)
-    if aggregator:
+    top_item = next((item for item in feedback.ai_responses if item.rank == 1), None)
+
+    def finish_session(aggregator):
         aggregator.set_end_time()
-        top_item = next((item for item in feedback.ai_responses if item.rank == 1), None)
         if top_item:
             aggregator.data["dialogue_segments"][0]["chosen_response"] = top_item.response_id
-        await append_session_log(aggregator.get_session_data())
+
+    aggregator = await session_store.update(feedback.session_id, feedback.patient_id, finish_session, create=False)
+    if aggregator:
+        await session_log_writer.submit(aggregator.get_session_data())
     enriched_feedback = {
         "session_id": feedback.session_id,
         "patient_id": feedback.patient_id,
@@ -188,8 +259,8 @@ async def submit_feedback(feedback: PilotFeedback):
         "ai_responses": [item.dict() for item in feedback.ai_responses],
         "timestamp": datetime.utcnow().isoformat() + "Z"
     }
-    result = await append_to_file(enriched_feedback, "data/expert_feedback.json", "feedbacks")
-    return {"message": "Feedback submitted", "result": result}
+    await feedback_writer.submit(enriched_feedback)
+    return {"message": "Feedback submitted", "result": "Data appended successfully."}
 
 ########################################
 # /voice_chat endpoint: Transcribe + Orchestrate + TTS
@@ -200,63 +271,52 @@ async def voice_chat(
     session_id: Optional[str] = None,
     patient_id: Optional[str] = "patient_1"
 ):
-    # 1) Save the uploaded audio file temporarily (likely .webm)
+    # 1) Read the uploaded audio (likely .webm) into memory
     contents = await audio_file.read()
-    with tempfile.NamedTemporaryFile(suffix=".webm", delete=False) as tmp:
-        tmp.write(contents)
-        tmp.flush()
-        webm_path = tmp.name
 
-    wav_path = webm_path + ".wav"
-    try:
-        # 2) Convert .webm -> .wav with ffmpeg (forcing WebM input)
-        convert_to_wav(webm_path, wav_path)
-        # 3) Transcribe using VoiceManager
-        OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "YOUR_OPENAI_KEY")
-        vm = VoiceManager(openai_api_key=OPENAI_API_KEY)
-        with open(wav_path, "rb") as f:
-            transcript = vm.transcribe_audio(f, filename="recording.wav", mime="audio/wav")
-    finally:
-        try:
-            os.remove(webm_path)
-            os.remove(wav_path)
-        except Exception as e:
-            print("Error cleaning up temporary files:", e)
-
-
-    # 4) Retrieve or create aggregator for multi-turn usage
-    if not session_id:
-        session_id = f"session_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
-    aggregator = session_states.get(session_id)
-    if not aggregator:
-        aggregator = SessionAggregator(session_id, patient_id)
-        session_states[session_id] = aggregator
-
-    # 5) Orchestrate therapy
+    # 2) Convert .webm -> .wav by piping through ffmpeg (forcing WebM input)
+    wav_data = await audio_converter.convert_to_wav(contents)
+
+    # 3) Transcribe using the shared VoiceManager
+    transcript = await voice_manager.transcribe_audio(wav_data, filename="recording.wav", mime="audio/wav")
+
+    # 4) Orchestrate therapy
+    new_session = not session_id
+    if new_session:
+        session_id = new_session_id()
     session_obj = Session(therapy_agents)
     agent_replies = await session_obj.generate_multiple_responses("multi_agent", transcript, 1)
     agent_response = agent_replies[0] if agent_replies else "No response."
-    seg_id = len(aggregator.data["dialogue_segments"]) + 1
-    aggregator.add_dialogue_segment({
-        "segment_id": seg_id,
-        "modality": "voice_chat",
-        "start_time": datetime.utcnow().isoformat() + "Z",
-        "end_time": datetime.utcnow().isoformat() + "Z",
-        "prompt": transcript,
-        "candidate_responses": [{"response_id": "res1", "text": agent_response}],
-        "chosen_response": "res1",
-        "agent_decisions": "multi_agent used for voice chat"
-    })
-
-    # 6) ElevenLabs TTS - create the MP3
-    ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY", "YOUR_ELEVENLABS_KEY")
-    ELEVENLABS_VOICE_KEY = os.getenv("ELEVENLABS_VOICE_KEY", "YOUR_CLONED_VOICE_ID")
-    tts = ElevenLabsTTS(api_key=ELEVENLABS_API_KEY, voice_id=ELEVENLABS_VOICE_KEY)
-    mp3_data = tts.synthesize_speech(agent_response)
+    start_time = datetime.utcnow().isoformat() + "Z"
+
+    # 5) Record the turn in the (possibly new) session; retried against the latest copy
+    #    if another worker handled a turn of the same session meanwhile
+    def add_turn(aggregator):
+        aggregator.add_dialogue_segment({
+            "segment_id": len(aggregator.data["dialogue_segments"]) + 1,
+            "modality": "voice_chat",
+            "start_time": start_time,
+            "end_time": datetime.utcnow().isoformat() + "Z",
+            "prompt": transcript,
+            "candidate_responses": [{"response_id": "res1", "text": agent_response}],
+            "chosen_response": "res1",
+            "agent_decisions": "multi_agent used for voice chat"
+        })
+
+    if new_session:
+        await session_store.create(session_id, patient_id, add_turn)
+    else:
+        await session_store.update(session_id, patient_id, add_turn)
+
+    # 6) ElevenLabs TTS - stream the MP3 as it is synthesized (or buffer it if streaming is disabled)
+    if TTS_STREAMING:
+        audio = await tts.stream_speech(agent_response)
+    else:
+        audio = io.BytesIO(await tts.synthesize_speech(agent_response))
 
     # 7) Return the MP3 as a streaming response
     return StreamingResponse(
-        io.BytesIO(mp3_data),
+        audio,
         media_type="audio/mpeg",
         headers={"session-id": session_id, "transcript": transcript.strip()}
     )
@@ -0,0 +1,232 @@
+import json
+
+import numpy as np
+
+# ---------------------------
+# Approximate nearest-neighbour index (IVF, cosine similarity)
+# ---------------------------
+
+class ANNIndex:
+    """
+    Inverted-file (IVF) index over L2-normalized embeddings, so inner
+    product equals cosine similarity.
+
+    Until `train_threshold` vectors have been added the index searches
+    exhaustively. After that it clusters the vectors into ~sqrt(N) lists
+    with spherical k-means; a query then only scores the vectors in its
+    `n_probe` closest lists. The coarse clustering is redone whenever the
+    index has doubled since the last training, so inserts stay cheap and
+    the lists stay balanced.
+    """
+
+    def __init__(self, dim, n_probe=8, train_threshold=2048, kmeans_iters=10, dtype=np.float32, seed=0):
+        self.dim = dim
+        self.n_probe = n_probe
+        self.train_threshold = train_threshold
+        self.kmeans_iters = kmeans_iters
+        self.dtype = dtype
+        self._rng = np.random.default_rng(seed)
+        self._vectors = np.zeros((0, dim), dtype=dtype)
+        self._size = 0
+        self.ids = []
+        self.centroids = None
+        self._assignments = np.zeros(0, dtype=np.int64)
+        self._lists = []
+        self._list_arrays = {}
+        self._trained_size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def vectors(self):
+        return self._vectors[:self._size]
+
+    # ---------------------------
+    # Insert / training
+    # ---------------------------
+
+    def _normalize(self, vectors):
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=self.dtype))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def add(self, vectors, ids=None):
+        """Inserts vectors (and optional external ids); returns the ids assigned."""
+        vectors = self._normalize(vectors)
+        count = len(vectors)
+        if ids is None:
+            ids = list(range(self._size, self._size + count))
+        else:
+            ids = list(ids)
+
+        if self._size + count > len(self._vectors):
+            capacity = max(64, 2 * len(self._vectors), self._size + count)
+            grown = np.zeros((capacity, self.dim), dtype=self.dtype)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+        start = self._size
+        self._vectors[start:start + count] = vectors
+        self._size += count
+        self.ids.extend(ids)
+
+        if self.centroids is None:
+            if self._size >= self.train_threshold:
+                self.train()
+        elif self._size >= 2 * self._trained_size:
+            self.train()
+        else:
+            assignments = np.argmax(vectors @ self.centroids.T, axis=1)
+            self._assignments = np.concatenate([self._assignments, assignments])
+            for offset, list_no in enumerate(assignments):
+                self._lists[list_no].append(start + offset)
+                self._list_arrays.pop(list_no, None)
+        return ids
+
+    def train(self, n_lists=None):
+        """(Re)builds the coarse quantizer with spherical k-means over the stored vectors."""
+        data = self.vectors
+        n_lists = n_lists or max(1, int(np.sqrt(self._size)))
+        n_lists = min(n_lists, self._size)
+        sample = data
+        if len(data) > 64 * n_lists:
+            sample = data[self._rng.choice(len(data), 64 * n_lists, replace=False)]
+
+        centroids = sample[self._rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(self.kmeans_iters):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=n_lists)
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[self._rng.choice(len(sample), int(empty.sum()))]
+            centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+
+        self.centroids = centroids.astype(self.dtype)
+        self._reassign()
+        self._trained_size = self._size
+
+    def _reassign(self):
+        self._assignments = np.empty(self._size, dtype=np.int64)
+        for start in range(0, self._size, 65536):
+            block = self._vectors[start:min(start + 65536, self._size)]
+            self._assignments[start:start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        order = np.argsort(self._assignments, kind="stable")
+        bounds = np.searchsorted(self._assignments[order], np.arange(len(self.centroids) + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]].tolist() for i in range(len(self.centroids))]
+        self._list_arrays = {}
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+
+    def _list_array(self, list_no):
+        array = self._list_arrays.get(list_no)
+        if array is None:
+            array = np.asarray(self._lists[list_no], dtype=np.int64)
+            self._list_arrays[list_no] = array
+        return array
+
+    def _candidates(self, query, n_probe):
+        if self.centroids is None:
+            return np.arange(self._size)
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        scores = self.centroids @ query
+        probe = np.argpartition(-scores, n_probe - 1)[:n_probe]
+        return np.concatenate([self._list_array(list_no) for list_no in probe])
+
+    def search(self, queries, k=10, n_probe=None):
+        """
+        Returns, for each query, (ids, cosine scores) of its top-k neighbours,
+        best first. A single 1-D query returns one pair instead of a list.
+        """
+        single = np.asarray(queries).ndim == 1
+        results = []
+        for query in self._normalize(queries):
+            candidates = self._candidates(query, n_probe)
+            if not len(candidates):
+                results.append(([], np.zeros(0, dtype=self.dtype)))
+                continue
+            scores = self._vectors[candidates] @ query
+            top = min(k, len(candidates))
+            best = np.argpartition(-scores, top - 1)[:top]
+            best = best[np.argsort(-scores[best])]
+            results.append(([self.ids[i] for i in candidates[best]], scores[best]))
+        return results[0] if single else results
+
+    def radius(self, query, threshold, n_probe=None):
+        """Returns (ids, cosine scores) of every indexed vector with similarity >= threshold, best first."""
+        query = self._normalize(query)[0]
+        positions, scores = self._radius_positions(query, threshold, n_probe)
+        return [self.ids[i] for i in positions], scores
+
+    def _radius_positions(self, query, threshold, n_probe=None):
+        candidates = self._candidates(query, n_probe)
+        scores = self._vectors[candidates] @ query
+        keep = scores >= threshold
+        positions, scores = candidates[keep], scores[keep]
+        order = np.argsort(-scores)
+        return positions[order], scores[order]
+
+    def similarity_edges(self, threshold, n_probe=None):
+        """
+        Returns [(id_i, id_j, score)] for every pair (inserted i before j) with cosine
+        similarity above threshold, probing only nearby lists instead of all pairs.
+        """
+        edges = []
+        for position in range(self._size):
+            neighbours, scores = self._radius_positions(self._vectors[position], threshold, n_probe)
+            for other, score in zip(neighbours, scores):
+                if other > position and score > threshold:
+                    edges.append((self.ids[position], self.ids[int(other)], float(score)))
+        return edges
+
+    # ---------------------------
+    # Persistence
+    # ---------------------------
+
+    @staticmethod
+    def _npz_path(path):
+        # np.savez appends .npz when it is missing; apply the same rule on load
+        path = str(path)
+        return path if path.endswith(".npz") else path + ".npz"
+
+    def save(self, path):
+        """Writes the index to `path` (".npz" is appended if missing); returns the path written."""
+        path = self._npz_path(path)
+        np.savez(
+            path,
+            vectors=self.vectors,
+            centroids=self.centroids if self.centroids is not None else np.zeros((0, self.dim), dtype=self.dtype),
+            ids=np.array(json.dumps(self.ids)),
+            config=np.array(json.dumps({
+                "dim": self.dim,
+                "n_probe": self.n_probe,
+                "train_threshold": self.train_threshold,
+                "kmeans_iters": self.kmeans_iters,
+                "trained_size": self._trained_size,
+                "dtype": np.dtype(self.dtype).name
+            }))
+        )
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(cls._npz_path(path)) as archive:
+            config = json.loads(str(archive["config"]))
+            index = cls(
+                config["dim"],
+                n_probe=config["n_probe"],
+                train_threshold=config["train_threshold"],
+                kmeans_iters=config["kmeans_iters"],
+                dtype=np.dtype(config["dtype"])
+            )
+            index._vectors = archive["vectors"].astype(index.dtype)
+            index._size = len(index._vectors)
+            index.ids = json.loads(str(archive["ids"]))
+            if len(archive["centroids"]):
+                index.centroids = archive["centroids"].astype(index.dtype)
+                index._trained_size = config["trained_size"]
+                index._reassign()
+        return index
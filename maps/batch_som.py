@@ -0,0 +1,210 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+
+# ---------------------------
+# Learning-rate / sigma schedules
+# ---------------------------
+# A schedule is any callable (epoch, n_epochs) -> value.
+
+def constant(value):
+    return lambda epoch, n_epochs: value
+
+def linear_decay(start, end):
+    def schedule(epoch, n_epochs):
+        if n_epochs <= 1:
+            return start
+        return start + (end - start) * epoch / (n_epochs - 1)
+    return schedule
+
+def exponential_decay(start, end):
+    def schedule(epoch, n_epochs):
+        if n_epochs <= 1:
+            return start
+        return start * (end / start) ** (epoch / (n_epochs - 1))
+    return schedule
+
+# ---------------------------
+# Shard statistics (module level so process pools can pickle it)
+# ---------------------------
+
+def best_matching_units(codebook, samples):
+    """Returns (bmu indices, squared distances) for a chunk, using ||x||^2 - 2x.w + ||w||^2."""
+    cross = samples @ codebook.T
+    distances = np.einsum("ij,ij->i", samples, samples)[:, None] - 2 * cross + np.einsum("ij,ij->i", codebook, codebook)[None, :]
+    bmus = np.argmin(distances, axis=1)
+    return bmus, np.maximum(distances[np.arange(len(samples)), bmus], 0.0)
+
+def shard_statistics(codebook, shard, chunk_size=8192):
+    """
+    Accumulates per-neuron sample sums and hit counts for one data shard,
+    plus the summed quantization error. The shard is walked in chunks so
+    memory-mapped inputs are never loaded in full.
+    """
+    k, dim = codebook.shape
+    sums = np.zeros((k, dim), dtype=np.float64)
+    counts = np.zeros(k, dtype=np.float64)
+    error = 0.0
+    for start in range(0, len(shard), chunk_size):
+        chunk = np.asarray(shard[start:start + chunk_size], dtype=codebook.dtype)
+        bmus, sq_distances = best_matching_units(codebook, chunk)
+        # Group the chunk by BMU and sum each group in one reduceat call
+        order = np.argsort(bmus, kind="stable")
+        units, starts = np.unique(bmus[order], return_index=True)
+        sums[units] += np.add.reduceat(chunk[order], starts, axis=0)
+        counts += np.bincount(bmus, minlength=k)
+        error += float(np.sqrt(sq_distances).sum())
+    return sums, counts, error
+
+# ---------------------------
+# Batch SOM Trainer
+# ---------------------------
+
+class BatchSOMTrainer:
+    """
+    Batch-mode SOM training shared by every map in maps/.
+
+    Each epoch computes the BMU of every sample with matrix operations,
+    sums the samples landing on each neuron (split across `workers` data
+    shards on a thread or process pool), then sets each neuron to the
+    neighbourhood-weighted mean of those sums. With a grid (OnlineSOM)
+    the Gaussian neighbourhood is applied separably along rows and
+    columns; without one (SimpleSOM, kohonen.SOM) it degenerates to
+    winner-take-all batch updates.
+
+    `learning_rate` blends the batch solution into the current weights
+    (1.0 is the classic batch SOM). Both it and `sigma` are schedules.
+    Training stops early once the relative change in quantization error
+    falls below `tol`.
+    """
+
+    def __init__(self, epochs=10, sigma=None, learning_rate=None, workers=None,
+                 executor="thread", chunk_size=8192, tol=1e-4):
+        self.epochs = epochs
+        self.sigma = sigma
+        self.learning_rate = learning_rate or constant(1.0)
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = executor
+        self.chunk_size = chunk_size
+        self.tol = tol
+
+    def _pool(self):
+        if self.executor == "process":
+            return ProcessPoolExecutor(max_workers=self.workers)
+        return ThreadPoolExecutor(max_workers=self.workers)
+
+    def _statistics(self, pool, codebook, data):
+        shard_size = math.ceil(len(data) / self.workers)
+        shards = [data[start:start + shard_size] for start in range(0, len(data), shard_size)]
+        futures = [pool.submit(shard_statistics, codebook, shard, self.chunk_size) for shard in shards]
+        sums = np.zeros(codebook.shape, dtype=np.float64)
+        counts = np.zeros(len(codebook), dtype=np.float64)
+        error = 0.0
+        for future in futures:
+            shard_sums, shard_counts, shard_error = future.result()
+            sums += shard_sums
+            counts += shard_counts
+            error += shard_error
+        return sums, counts, error
+
+    @staticmethod
+    def _smooth(values, grid_shape, sigma):
+        # Separable Gaussian over the grid: rows then columns
+        m, n = grid_shape
+        rows = np.arange(m)
+        cols = np.arange(n)
+        row_kernel = np.exp(-(rows[:, None] - rows[None, :]) ** 2 / (2 * sigma ** 2))
+        col_kernel = np.exp(-(cols[:, None] - cols[None, :]) ** 2 / (2 * sigma ** 2))
+        grid = values.reshape(m, n, -1)
+        grid = np.tensordot(row_kernel, grid, axes=(1, 0))
+        grid = np.tensordot(col_kernel, grid, axes=(1, 1)).transpose(1, 0, 2)
+        return grid.reshape(values.shape)
+
+    def fit(self, weights, data, grid_shape=None):
+        """
+        Trains `weights` on `data` in place and returns a report.
+
+        weights:    (K, D) codebook, or (m, n, D) grid (grid_shape inferred)
+        data:       (N, D) array-like; memory-mapped arrays are read in chunks
+        grid_shape: (m, n) when a flat (K, D) codebook is laid out on a grid
+        """
+        if weights.ndim == 3:
+            grid_shape = weights.shape[:2]
+        codebook = weights.reshape(-1, weights.shape[-1])
+        sigma_schedule = self.sigma
+        if grid_shape is not None and sigma_schedule is None:
+            sigma_schedule = exponential_decay(max(max(grid_shape) / 2.0, 0.5), 0.5)
+
+        errors = []
+        converged = False
+        with self._pool() as pool:
+            for epoch in range(self.epochs):
+                sums, counts, error = self._statistics(pool, codebook, data)
+                errors.append(error / max(len(data), 1))
+
+                if grid_shape is not None:
+                    sigma = sigma_schedule(epoch, self.epochs)
+                    sums = self._smooth(sums, grid_shape, sigma)
+                    counts = self._smooth(counts[:, None], grid_shape, sigma)[:, 0]
+
+                hit = counts > 1e-12
+                target = codebook.copy()
+                target[hit] = sums[hit] / counts[hit, None]
+                rate = self.learning_rate(epoch, self.epochs)
+                codebook += rate * (target - codebook)
+
+                if len(errors) > 1 and errors[-2] > 0 and abs(errors[-2] - errors[-1]) / errors[-2] < self.tol:
+                    converged = True
+                    break
+
+        # reshape() may have copied a non-contiguous input; make sure the caller's weights are updated
+        weights[...] = codebook.reshape(weights.shape)
+
+        # Final pass on the trained weights for the reported errors
+        distance_total, topographic_errors = 0.0, 0
+        for start in range(0, len(data), self.chunk_size):
+            chunk = np.asarray(data[start:start + self.chunk_size], dtype=codebook.dtype)
+            _, chunk_sq = best_matching_units(codebook, chunk)
+            distance_total += float(np.sqrt(chunk_sq).sum())
+            if grid_shape is not None and len(codebook) > 1:
+                topographic_errors += self._topographic_errors(codebook, chunk, grid_shape)
+
+        report = {
+            "epochs_run": len(errors),
+            "converged": converged,
+            "quantization_error_history": errors,
+            "quantization_error": distance_total / max(len(data), 1),
+        }
+        if grid_shape is not None:
+            report["topographic_error"] = topographic_errors / max(len(data), 1)
+        return report
+
+    @staticmethod
+    def _topographic_errors(codebook, chunk, grid_shape):
+        # A sample counts as an error when its two best units are not grid neighbours
+        cross = chunk @ codebook.T
+        distances = np.einsum("ij,ij->i", codebook, codebook)[None, :] - 2 * cross
+        best_two = np.argpartition(distances, 1, axis=1)[:, :2]
+        rows, cols = np.divmod(best_two, grid_shape[1])
+        adjacent = np.maximum(np.abs(rows[:, 0] - rows[:, 1]), np.abs(cols[:, 0] - cols[:, 1])) <= 1
+        return int((~adjacent).sum())
+
+# ---------------------------
+# Convenience wrappers for the maps/ SOMs
+# ---------------------------
+
+def train_online_som(som, data, **trainer_kwargs):
+    """Batch-trains an OnlineSOM's (m, n, D) grid in place."""
+    return BatchSOMTrainer(**trainer_kwargs).fit(som.weights, data)
+
+def train_simple_som(som, data, **trainer_kwargs):
+    """Batch-trains a SimpleSOM's (clusters, D) weights in place (winner-take-all)."""
+    return BatchSOMTrainer(**trainer_kwargs).fit(som.weights, data)
+
+def train_codebook(weights, data, **trainer_kwargs):
+    """Batch-trains a kohonen.SOM style weight list; returns (weights array, report)."""
+    weights = np.array(weights, dtype=np.float64)
+    report = BatchSOMTrainer(**trainer_kwargs).fit(weights, data)
+    return weights, report
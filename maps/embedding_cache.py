@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".embedding_cache")
+
+# ---------------------------
+# Persistent embedding cache
+# ---------------------------
+
+class EmbeddingCache:
+    """
+    Content-addressed, on-disk cache of sentence embeddings for one model.
+
+    Vectors live in a memory-mapped matrix (embeddings.bin, float16 by
+    default) that grows by doubling; keys.txt lists the sha256 of each
+    row's text, one per line, in row order. Lookups go through an
+    in-memory key -> row dict, and only texts missing from the cache are
+    sent to the encoder, in one batch.
+    """
+
+    def __init__(self, model_name, directory=DEFAULT_CACHE_DIR, dtype=np.float16):
+        self.model_name = model_name
+        self.directory = os.path.join(directory, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._matrix = None
+        self.dim = None
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._meta_path = os.path.join(self.directory, "meta.json")
+        self._keys_path = os.path.join(self.directory, "keys.txt")
+        self._matrix_path = os.path.join(self.directory, "embeddings.bin")
+        self._open()
+
+    def _open(self):
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path, "r", encoding="utf-8") as file:
+            meta = json.load(file)
+        self.dim = meta["dim"]
+        self.dtype = np.dtype(meta["dtype"])
+        with open(self._keys_path, "r", encoding="utf-8") as file:
+            keys = [line.rstrip("\n") for line in file if line.endswith("\n")]
+        capacity = os.path.getsize(self._matrix_path) // (self.dim * self.dtype.itemsize)
+        # Rows are written before their key, so any key present has its vector on disk
+        self._rows = {key: row for row, key in enumerate(keys[:capacity])}
+        self._matrix = np.memmap(self._matrix_path, dtype=self.dtype, mode="r+", shape=(capacity, self.dim))
+
+    def __len__(self):
+        return len(self._rows)
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _ensure_capacity(self, rows_needed):
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if rows_needed <= capacity:
+            return
+        new_capacity = max(1024, 2 * capacity, rows_needed)
+        if self._matrix is not None:
+            self._matrix.flush()
+            del self._matrix
+        with open(self._matrix_path, "ab") as file:
+            file.truncate(new_capacity * self.dim * self.dtype.itemsize)
+        self._matrix = np.memmap(self._matrix_path, dtype=self.dtype, mode="r+", shape=(new_capacity, self.dim))
+
+    def _append(self, keys, vectors):
+        vectors = np.asarray(vectors)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            with open(self._meta_path, "w", encoding="utf-8") as file:
+                json.dump({"model_name": self.model_name, "dim": self.dim, "dtype": self.dtype.name}, file)
+        start = len(self._rows)
+        self._ensure_capacity(start + len(keys))
+        self._matrix[start:start + len(keys)] = vectors.astype(self.dtype)
+        self._matrix.flush()
+        with open(self._keys_path, "a", encoding="utf-8") as file:
+            file.write("".join(key + "\n" for key in keys))
+        for offset, key in enumerate(keys):
+            self._rows[key] = start + offset
+
+    def encode(self, texts, encoder):
+        """
+        Returns a float32 (len(texts), dim) array of embeddings for `texts`.
+        `encoder` is called once, with the list of distinct uncached texts,
+        and must return their embeddings (e.g. SentenceTransformer.encode).
+        """
+        texts = [str(text) for text in texts]
+        keys = [self.key(text) for text in texts]
+        with self._lock:
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in self._rows and key not in missing:
+                    missing[key] = text
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+
+            if missing:
+                vectors = encoder(list(missing.values()))
+                self._append(list(missing), vectors)
+
+            if not texts:
+                return np.zeros((0, self.dim or 0), dtype=np.float32)
+            rows = np.fromiter((self._rows[key] for key in keys), dtype=np.int64, count=len(keys))
+            return np.asarray(self._matrix[rows], dtype=np.float32)
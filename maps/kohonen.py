@@ -1,32 +1,65 @@
-import math
+import numpy as np
 
 class SOM:
+	"""
+	Winner-take-all Kohonen classifier over C clusters and D dimensions.
+
+	Weights are a (C, D) NumPy array (nested lists are still accepted and
+	updated in place). Set dtype=np.float32 to halve memory and bandwidth
+	on wide embeddings such as 384-d MiniLM vectors.
+	"""
+
+	def __init__(self, dtype=np.float64, chunk_size=4096):
+		self.dtype = dtype
+		self.chunk_size = chunk_size
+
+	def _as_array(self, weights):
+		if isinstance(weights, np.ndarray) and weights.dtype == self.dtype:
+			return weights
+		return np.asarray(weights, dtype=self.dtype)
+
+	# Function here computes the winning vectors for many samples at once
+	# by squared Euclidean distance, ||x||^2 - 2 x.w + ||w||^2
+	def winners(self, weights, samples):
+		weights = self._as_array(weights)
+		samples = np.atleast_2d(np.asarray(samples, dtype=self.dtype))
+		weight_norms = np.einsum("ij,ij->i", weights, weights)
+		result = np.empty(len(samples), dtype=np.int64)
+		for start in range(0, len(samples), self.chunk_size):
+			chunk = samples[start:start + self.chunk_size]
+			distances = weight_norms[None, :] - 2 * (chunk @ weights.T)
+			# Ties go to the highest cluster index, as in the original two-cluster rule
+			result[start:start + self.chunk_size] = len(weights) - 1 - np.argmin(distances[:, ::-1], axis=1)
+		return result
 
 	# Function here computes the winning vector
 	# by Euclidean distance
 	def winner(self, weights, sample):
-
-		D0 = 0
-		D1 = 0
-
-		for i in range(len(sample)):
-
-			D0 = D0 + math.pow((sample[i] - weights[0][i]), 2)
-			D1 = D1 + math.pow((sample[i] - weights[1][i]), 2)
-
+		weights = self._as_array(weights)
+		distances = np.sum((weights - np.asarray(sample, dtype=self.dtype)) ** 2, axis=1)
 		# Selecting the cluster with smallest distance as winning cluster
-
-		if D0 < D1:
-			return 0
-		else:
-			return 1
+		return int(len(weights) - 1 - np.argmin(distances[::-1]))
 
 	# Function here updates the winning vector
 	def update(self, weights, sample, J, alpha):
-		# Here iterating over the weights of winning cluster and modifying them
-		for i in range(len(weights[0])):
-			weights[J][i] = weights[J][i] + alpha * (sample[i] - weights[J][i])
+		sample = np.asarray(sample, dtype=self.dtype)
+		if isinstance(weights, np.ndarray):
+			# Moving the winning cluster towards the sample, in place
+			row = weights[J]
+			row += alpha * (sample - row)
+		else:
+			row = np.asarray(weights[J], dtype=self.dtype)
+			weights[J] = (row + alpha * (sample - row)).tolist()
+
+		return weights
 
+	# Function here trains online over many samples (one winner + update each)
+	def train(self, weights, samples, alpha, epochs=1):
+		weights = self._as_array(weights)
+		samples = np.asarray(samples, dtype=self.dtype)
+		for _ in range(epochs):
+			for sample in samples:
+				self.update(weights, sample, self.winner(weights, sample), alpha)
 		return weights
 
 # Driver code
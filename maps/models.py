@@ -0,0 +1,38 @@
+import threading
+
+from embedding_cache import EmbeddingCache
+
+DEFAULT_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# ---------------------------
+# Lazily constructed singletons
+# ---------------------------
+# sentence_transformers (and torch) are only imported the first time a
+# model is actually needed, so importing the maps modules stays cheap.
+
+_models = {}
+_caches = {}
+_lock = threading.Lock()
+
+def get_sentence_model(model_name=DEFAULT_MODEL_NAME):
+    with _lock:
+        model = _models.get(model_name)
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(model_name)
+            _models[model_name] = model
+        return model
+
+def get_embedding_cache(model_name=DEFAULT_MODEL_NAME):
+    with _lock:
+        cache = _caches.get(model_name)
+        if cache is None:
+            cache = EmbeddingCache(model_name)
+            _caches[model_name] = cache
+        return cache
+
+def embed_texts(texts, model_name=DEFAULT_MODEL_NAME):
+    """Embeds texts through the on-disk cache; the model is loaded only if some text is uncached."""
+    return get_embedding_cache(model_name).encode(
+        list(texts), lambda missing: get_sentence_model(model_name).encode(missing)
+    )
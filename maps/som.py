@@ -0,0 +1,62 @@
+import numpy as np
+
+# ---------------------------
+# Online SOM Implementation
+# ---------------------------
+
+class OnlineSOM:
+    """
+    Self-organizing map trained one sample at a time.
+
+    The grid coordinates are precomputed once, and the Gaussian
+    neighbourhood is built from two 1-D kernels (rows and columns), since
+    exp(-(di^2 + dj^2) / 2s^2) = exp(-di^2 / 2s^2) * exp(-dj^2 / 2s^2).
+    Each update is therefore a handful of array operations over the whole
+    grid instead of an m*n Python loop.
+    """
+
+    def __init__(self, m, n, input_dim, learning_rate=0.1, sigma=1.0):
+        self.m = m
+        self.n = n
+        self.input_dim = input_dim
+        self.learning_rate = learning_rate
+        self.sigma = sigma
+        self.weights = np.random.random((m, n, input_dim))
+        # (m*n, 2) table of neuron grid coordinates, row-major
+        self.positions = np.indices((m, n)).reshape(2, -1).T
+        self._kernel_sigma = None
+
+    def _axis_kernels(self):
+        # Kernels over every possible offset (-(size-1) .. size-1), rebuilt only when sigma changes
+        if self._kernel_sigma != self.sigma:
+            denom = 2 * (self.sigma ** 2)
+            self._row_kernel = np.exp(-np.arange(-(self.m - 1), self.m) ** 2 / denom)
+            self._col_kernel = np.exp(-np.arange(-(self.n - 1), self.n) ** 2 / denom)
+            self._kernel_sigma = self.sigma
+        return self._row_kernel, self._col_kernel
+
+    def neighbourhood(self, bmu_index):
+        """Returns the (m, n) Gaussian neighbourhood weights around bmu_index."""
+        row_kernel, col_kernel = self._axis_kernels()
+        i, j = bmu_index
+        rows = row_kernel[self.m - 1 - i: 2 * self.m - 1 - i]
+        cols = col_kernel[self.n - 1 - j: 2 * self.n - 1 - j]
+        return np.outer(rows, cols)
+
+    def get_bmu(self, sample):
+        distances = np.linalg.norm(self.weights - sample, axis=2)
+        return np.unravel_index(np.argmin(distances), distances.shape)
+
+    def update(self, sample):
+        bmu_index = self.get_bmu(sample)
+        h = self.neighbourhood(bmu_index)
+        self.weights += (self.learning_rate * h)[:, :, np.newaxis] * (sample - self.weights)
+        return bmu_index
+
+    def update_many(self, samples):
+        """Applies update() to each sample in order; returns the (len(samples), 2) array of BMUs."""
+        samples = np.asarray(samples, dtype=self.weights.dtype)
+        bmus = np.empty((len(samples), 2), dtype=np.int64)
+        for k, sample in enumerate(samples):
+            bmus[k] = self.update(sample)
+        return bmus
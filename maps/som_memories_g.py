@@ -1,8 +1,7 @@
 import pandas as pd
 import random
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import pandas as pd
+from models import embed_texts
 
 
 life_periods = [
@@ -38,20 +37,16 @@ def generate_conway_memory_dataset(n=100):
     df = df.sample(frac=1).reset_index(drop=True)
     return df
 
-conway_memory_dataset = generate_conway_memory_dataset(100)
-# print(conway_memory_dataset.head(50))
-
-# Semantic embeddings (SentenceTransformer)
-model = SentenceTransformer('all-MiniLM-L6-v2')
-text_embeddings = model.encode(conway_memory_dataset["Memory"])
-
-# One-hot encode categorical dimensions clearly
-categorical_embeddings = pd.get_dummies(conway_memory_dataset[["Person", "Place", "Event", "Time"]]).values
+def build_conway_embeddings(dataset):
+    """Combines semantic text embeddings with one-hot categorical features for a Conway dataset."""
+    # Semantic embeddings (SentenceTransformer, via the embedding cache)
+    text_embeddings = embed_texts(dataset["Memory"])
 
-# Combine embeddings
-combined_embeddings = np.concatenate([text_embeddings, categorical_embeddings], axis=1)
+    # One-hot encode categorical dimensions clearly
+    categorical_embeddings = pd.get_dummies(dataset[["Person", "Place", "Event", "Time"]]).values
 
-print("Combined embeddings shape:", combined_embeddings.shape)
+    # Combine embeddings
+    return np.concatenate([text_embeddings, categorical_embeddings], axis=1)
 
 
 def generate_lifetime_dataset(n=50):
@@ -68,5 +63,15 @@ def generate_lifetime_dataset(n=50):
     df = pd.DataFrame(data, columns=["Memory", "Period", "Themes", "Location", "Duration", "Emotion"])
     return df.sample(frac=1).reset_index(drop=True)
 
-# Generate lifetime dataset explicitly aligned to Conway
-dataset = generate_lifetime_dataset(50)
\ No newline at end of file
+def main():
+    conway_memory_dataset = generate_conway_memory_dataset(100)
+    # print(conway_memory_dataset.head(50))
+    combined_embeddings = build_conway_embeddings(conway_memory_dataset)
+    print("Combined embeddings shape:", combined_embeddings.shape)
+
+    # Generate lifetime dataset explicitly aligned to Conway
+    dataset = generate_lifetime_dataset(50)
+    return conway_memory_dataset, combined_embeddings, dataset
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,27 @@
 import networkx as nx
-import matplotlib.pyplot as plt
-from sklearn.metrics.pairwise import cosine_similarity
+from ann_index import ANNIndex
 
-# Compute pairwise similarity clearly
-similarity_matrix = cosine_similarity(memory_embeddings)
+def build_similarity_network(memory_embeddings, memories, threshold=0.8):
+    """Builds a memory similarity graph: one node per memory, edges above `threshold` cosine similarity."""
+    # Compute pairwise similarity clearly (via the ANN index, not a dense matrix)
+    memory_index = ANNIndex(dim=memory_embeddings.shape[1])
+    memory_index.add(memory_embeddings)
 
-# Build network
-G = nx.Graph()
+    # Build network
+    G = nx.Graph()
 
-# Add nodes (memories)
-for idx, memory in enumerate(text_memory_dataset['Memory']):
-    G.add_node(idx, label=memory)
+    # Add nodes (memories)
+    for idx, memory in enumerate(memories):
+        G.add_node(idx, label=memory)
 
-# Add edges clearly (threshold-based)
-threshold = 0.8
-for i in range(len(similarity_matrix)):
-    for j in range(i + 1, len(similarity_matrix)):
-        if similarity_matrix[i, j] > threshold:
-            G.add_edge(i, j, weight=similarity_matrix[i, j])
+    # Add edges clearly (threshold-based)
+    G.add_weighted_edges_from(memory_index.similarity_edges(threshold))
+    return G
 
-# Visualize
-pos = nx.spring_layout(G, k=0.5)
-nx.draw(G, pos, with_labels=True, labels=nx.get_node_attributes(G, 'label'), node_size=3000, node_color='lightblue', font_size=10)
-plt.show()
+def draw_network(G):
+    import matplotlib.pyplot as plt
+
+    # Visualize
+    pos = nx.spring_layout(G, k=0.5)
+    nx.draw(G, pos, with_labels=True, labels=nx.get_node_attributes(G, 'label'), node_size=3000, node_color='lightblue', font_size=10)
+    plt.show()
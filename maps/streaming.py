@@ -0,0 +1,107 @@
+import numpy as np
+
+from models import DEFAULT_MODEL_NAME, embed_texts
+from som import OnlineSOM
+
+# ---------------------------
+# Streaming dimensionality reduction
+# ---------------------------
+
+class IncrementalProjector:
+    """
+    PCA projection that keeps learning as memories arrive.
+
+    Samples are buffered and folded into an IncrementalPCA every
+    `batch_size` samples (the first fit happens as soon as `n_components`
+    samples exist). transform() uses a frozen copy of the components, so
+    projecting a new memory is one (D x k) product. After each refit the
+    new components are sign-aligned with the previous ones, so
+    already-placed memories do not jump to the mirror side of the map.
+    """
+
+    def __init__(self, n_components=4, batch_size=32):
+        # sklearn is imported here rather than at module level, so importing
+        # this module (e.g. from the viewer) stays cheap.
+        from sklearn.decomposition import IncrementalPCA
+
+        self.n_components = n_components
+        self.batch_size = batch_size
+        self.ipca = IncrementalPCA(n_components=n_components)
+        self.components_ = None
+        self.mean_ = None
+        self.n_samples_seen_ = 0
+        self._buffer = []
+
+    @property
+    def fitted(self):
+        return self.components_ is not None
+
+    def partial_fit(self, samples):
+        """Buffers samples and refits once enough have accumulated. Returns True if the projection changed."""
+        self._buffer.extend(np.atleast_2d(np.asarray(samples, dtype=np.float64)))
+        needed = self.batch_size if self.fitted else max(self.n_components, 2)
+        if len(self._buffer) < needed:
+            return False
+
+        batch = np.vstack(self._buffer)
+        self._buffer = []
+        self.ipca.partial_fit(batch)
+        self.n_samples_seen_ = int(self.ipca.n_samples_seen_)
+
+        components = self.ipca.components_.copy()
+        if self.components_ is not None:
+            signs = np.sign(np.einsum("ij,ij->i", components, self.components_))
+            signs[signs == 0] = 1
+            components *= signs[:, None]
+        self.components_ = components
+        self.mean_ = self.ipca.mean_.copy()
+        return True
+
+    def transform(self, samples):
+        if not self.fitted:
+            raise ValueError("IncrementalProjector has not seen enough samples to project yet.")
+        return (np.atleast_2d(np.asarray(samples, dtype=np.float64)) - self.mean_) @ self.components_.T
+
+# ---------------------------
+# Live memory placement
+# ---------------------------
+
+class StreamingMemoryMap:
+    """
+    Places memories from a live session onto an OnlineSOM one at a time:
+    embed (cached) -> project (IncrementalProjector) -> OnlineSOM.update.
+
+    The first few memories are held until the projector can fit; they are
+    placed together as soon as it does. `assignments` maps each memory's
+    position in the stream to its BMU.
+    """
+
+    def __init__(self, som=None, projector=None, model_name=DEFAULT_MODEL_NAME):
+        self.projector = projector or IncrementalProjector()
+        self.som = som or OnlineSOM(m=4, n=4, input_dim=self.projector.n_components)
+        self.model_name = model_name
+        self.memories = []
+        self.assignments = {}
+        self._pending = []
+
+    def add_embedding(self, text, embedding):
+        """Places one pre-computed embedding; returns its BMU, or None while the projector warms up."""
+        position = len(self.memories)
+        self.memories.append(text)
+        self.projector.partial_fit(embedding)
+        if not self.projector.fitted:
+            self._pending.append((position, embedding))
+            return None
+
+        # Memories that arrived before the first fit are placed now, in order
+        for pending_position, pending_embedding in self._pending:
+            self.assignments[pending_position] = self.som.update(self.projector.transform(pending_embedding)[0])
+        self._pending = []
+
+        bmu = self.som.update(self.projector.transform(embedding)[0])
+        self.assignments[position] = bmu
+        return bmu
+
+    def add_memory(self, text):
+        embedding = embed_texts([text], self.model_name)[0]
+        return self.add_embedding(text, embedding)
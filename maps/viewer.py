@@ -0,0 +1,123 @@
+import numpy as np
+import matplotlib.pyplot as plt
+import networkx as nx
+from matplotlib.widgets import Button
+from ann_index import ANNIndex
+
+# ---------------------------
+# Interactive SOM / similarity viewer
+# ---------------------------
+
+class MemoryMapViewer:
+    """
+    Streams memories into an OnlineSOM one "Next" click at a time, showing
+    the BMU mapping on the left and the memory similarity network on the right.
+
+    With a `memory_map` (a StreamingMemoryMap), `stream_data` holds raw
+    embeddings and each click places the memory through the map's
+    incremental projection instead of feeding pre-reduced samples to `som`;
+    memories held while the projector warms up appear once it has fitted.
+
+    The similarity network is maintained incrementally: each click queries
+    the index for the new memory's neighbours only, adds just those edges,
+    and places the new node by relaxing it against its neighbours (earlier
+    positions are kept). A full warm-started relayout runs every
+    `relayout_every` clicks, so the per-click cost stays roughly flat.
+    """
+
+    def __init__(self, som, stream_data, texts, similarity_threshold=0.7, relayout_every=25, memory_map=None):
+        self.som = memory_map.som if memory_map is not None else som
+        self.memory_map = memory_map
+        self.stream_data = stream_data
+        self.texts = list(texts)
+        self.similarity_threshold = similarity_threshold
+        self.memory_records = []
+        self.bmu_assignments = []
+        self.relayout_every = relayout_every
+        self.memory_index = ANNIndex(dim=stream_data.shape[1])
+        self.graph = nx.Graph()
+        self.pos = {}
+        self.current_idx = 0
+        self.fig = None
+        self.ax = None
+
+    def update_plot(self, event):
+        if self.current_idx >= len(self.stream_data):
+            return
+
+        som, ax = self.som, self.ax
+        sample = self.stream_data[self.current_idx]
+        if self.memory_map is not None:
+            self.memory_map.add_embedding(self.texts[self.current_idx], sample)
+            assignments = self.memory_map.assignments
+            self.bmu_assignments = [assignments[position] for position in sorted(assignments)]
+        else:
+            self.bmu_assignments.append(som.update(sample))
+        self._add_to_network(self.current_idx, sample, self.texts[self.current_idx])
+        self.memory_records.append(self.texts[self.current_idx])
+        self.current_idx += 1
+
+        ax[0].clear()
+        ax[1].clear()
+
+        neuron_positions = som.positions
+        ax[0].scatter(neuron_positions[:, 0], neuron_positions[:, 1], s=150, c='red', marker='s', label='Neurons')
+
+        if self.bmu_assignments:
+            bmu_array = np.array(self.bmu_assignments)
+            jitter = np.random.normal(0, 0.1, bmu_array.shape)
+            points = bmu_array + jitter
+            ax[0].scatter(points[:, 0], points[:, 1], s=50, c='blue', label='Memory BMUs')
+        ax[0].set_title("SOM Grid & Memory BMU Mapping")
+        ax[0].set_xlim(-1, som.m)
+        ax[0].set_ylim(-1, som.n)
+        ax[0].legend()
+
+        if len(self.memory_records) > 1:
+            G = self.graph
+            nx.draw(G, self.pos, ax=ax[1], with_labels=True, labels=nx.get_node_attributes(G, 'label'), node_size=300, node_color='skyblue', font_size=7)
+            ax[1].set_title("Memory Similarity Network")
+
+        plt.draw()
+
+    def _add_to_network(self, node, sample, label):
+        # Only the new row of the similarity matrix is computed
+        neighbours, scores = self.memory_index.radius(sample, self.similarity_threshold)
+        self.memory_index.add(sample, ids=[node])
+        self.graph.add_node(node, label=label)
+        self.graph.add_weighted_edges_from(
+            (node, other, float(score)) for other, score in zip(neighbours, scores) if score > self.similarity_threshold
+        )
+
+        if len(self.graph) % self.relayout_every == 0:
+            # Periodic global tidy-up, warm-started from the current layout
+            self.pos[node] = self._initial_position(neighbours)
+            self.pos = nx.spring_layout(self.graph, pos=self.pos, k=0.5, iterations=20, seed=42)
+            return
+
+        self.pos[node] = self._initial_position(neighbours)
+        if neighbours:
+            local = self.graph.subgraph([node] + list(neighbours))
+            local_pos = nx.spring_layout(
+                local, pos={n: self.pos[n] for n in local}, fixed=list(neighbours), k=0.5, iterations=20, seed=42
+            )
+            self.pos[node] = local_pos[node]
+
+    def _initial_position(self, neighbours):
+        if neighbours:
+            return np.mean([self.pos[n] for n in neighbours], axis=0) + np.random.normal(0, 0.05, 2)
+        if self.pos:
+            points = np.array(list(self.pos.values()))
+            return np.random.uniform(points.min(axis=0), points.max(axis=0))
+        return np.zeros(2)
+
+    def show(self):
+        # Setup plot
+        self.fig, self.ax = plt.subplots(1, 2, figsize=(15, 8))
+        plt.subplots_adjust(bottom=0.2)
+
+        ax_next = plt.axes([0.45, 0.05, 0.1, 0.075])
+        bnext = Button(ax_next, 'Next')
+        bnext.on_clicked(self.update_plot)
+
+        plt.show()
@@ -0,0 +1,438 @@
+import importlib.util
+import json
+import os
+import re
+import sys
+from collections import deque
+
+import numpy as np
+
+ENTITY_SECTIONS = ("nodes", "people", "events", "locations")
+LINK_SECTIONS = ("links", "connections")
+TEXT_FIELDS = ("name", "aliases", "relationship", "description", "tags", "type")
+
+STOPWORDS = {
+    "a", "an", "and", "the", "i", "my", "me", "we", "our", "to", "of", "in", "on", "at", "with",
+    "was", "were", "is", "it", "for", "that", "this", "he", "she", "they", "his", "her", "their",
+    "went", "go", "had", "have", "did", "do", "so", "but", "or", "when", "then", "there", "remember"
+}
+
+def _tokens(text):
+    return set(re.findall(r"[a-z0-9']+", str(text).lower())) - STOPWORDS
+
+MAPS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "maps")
+
+def load_text_embedder(model_name="all-MiniLM-L6-v2"):
+    """
+    Returns `embed(texts, cache=True)` -> float32 (len(texts), dim) array,
+    backed by the on-disk embedding cache in maps/models.py, or None if
+    sentence_transformers isn't installed. Memory text is looked up by hash
+    and only uncached texts reach the model, in one batch; utterances are
+    embedded with cache=False so they are never written to disk.
+    """
+    if importlib.util.find_spec("sentence_transformers") is None:
+        return None
+    if MAPS_DIR not in sys.path:
+        sys.path.append(MAPS_DIR)  # the maps modules import their siblings by bare name
+    import models
+
+    def embed(texts, cache=True):
+        if cache:
+            return models.embed_texts(texts, model_name)
+        return np.asarray(models.get_sentence_model(model_name).encode(list(texts)), dtype=np.float32)
+    return embed
+
+# -------------------------------------
+# MemoryBankRetriever Class
+# -------------------------------------
+class MemoryBankRetriever:
+    """
+    Picks the memory-bank entities relevant to one utterance, so the memory
+    extraction agent sees a small, bounded slice of the bank instead of all of it.
+
+    Entities are indexed by the words of their name, aliases, relationship,
+    description and tags. An utterance scores each entity by word overlap
+    (name/alias matches count double) and, when `embed_fn` is given, by the
+    cosine similarity of their embeddings. Embeddings are kept as rows of
+    one normalized float32 matrix, so the similarity pass is a single
+    matrix-vector product; a changed entity overwrites its row. Each
+    update() embeds its entities in one batch, and with a cached embedder
+    (load_text_embedder) only text new to the cache reaches the model, so
+    startup does not re-encode the bank one sentence at a time. The best
+    `max_entities` entities, and the links among them, are serialized
+    compactly up to `max_chars`.
+    Call `update()` with each stored memory so the index never goes stale.
+    """
+
+    def __init__(self, memory_bank=None, embed_fn=None, max_entities=12, max_chars=4000, min_similarity=0.35):
+        self.embed_fn = embed_fn
+        self.max_entities = max_entities
+        self.max_chars = max_chars
+        self.min_similarity = min_similarity
+        self.entities = {}
+        self.sections = {}
+        self.links = {}
+        self._links_by_entity = {}
+        self._name_index = {}
+        self._word_index = {}
+        self._entity_words = {}
+        self._embeddings = None
+        self._embedding_ids = []
+        self._embedding_rows = {}
+        self._unembedded = {}
+        self.update(memory_bank or {})
+
+    # ---------------------------------
+    # Indexing
+    # ---------------------------------
+    def _index_entity(self, section, entity):
+        entity_id = entity.get("id")
+        if entity_id is None:
+            return
+        if entity_id in self.entities:
+            self._unindex(entity_id)
+        self.entities[entity_id] = entity
+        self.sections[entity_id] = section
+
+        names = [entity.get("name", "")] + list(entity.get("aliases", []) or [])
+        name_words = set().union(*(_tokens(name) for name in names))
+        for word in name_words:
+            self._name_index.setdefault(word, set()).add(entity_id)
+        words = set()
+        for field in TEXT_FIELDS:
+            value = entity.get(field)
+            words |= _tokens(" ".join(map(str, value)) if isinstance(value, list) else value or "")
+        for word in words:
+            self._word_index.setdefault(word, set()).add(entity_id)
+        self._entity_words[entity_id] = (name_words, words)
+
+        if self.embed_fn is not None:
+            self._unembedded[entity_id] = self._describe(entity)
+
+    def _unindex(self, entity_id):
+        name_words, words = self._entity_words.pop(entity_id, ((), ()))
+        for word in name_words:
+            self._name_index[word].discard(entity_id)
+        for word in words:
+            self._word_index[word].discard(entity_id)
+
+    @staticmethod
+    def _describe(entity):
+        parts = [entity.get("name"), entity.get("relationship"), entity.get("description")]
+        tags = entity.get("tags")
+        if tags:
+            parts.append(", ".join(map(str, tags)))
+        return " - ".join(str(part) for part in parts if part)
+
+    def update(self, memory):
+        """Indexes new or changed entities and links from a memory-bank fragment."""
+        for section in ENTITY_SECTIONS:
+            for entity in memory.get(section, []) or []:
+                if isinstance(entity, dict):
+                    self._index_entity(section, entity)
+        for section in LINK_SECTIONS:
+            for link in memory.get(section, []) or []:
+                if not isinstance(link, dict):
+                    continue
+                key = (link.get("source"), link.get("target"))
+                self.links[key] = (section, link)
+                for endpoint in key:
+                    self._links_by_entity.setdefault(endpoint, set()).add(key)
+        self._store_embeddings()
+
+    def _store_embeddings(self):
+        # Everything this update touched is encoded in one embed_fn call; changed
+        # entities overwrite their row and new ones are appended in one vstack
+        if not self._unembedded:
+            return
+        vectors = np.asarray(self.embed_fn(list(self._unembedded.values())), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        added = []
+        for entity_id, vector in zip(self._unembedded, vectors):
+            row = self._embedding_rows.get(entity_id)
+            if row is None:
+                self._embedding_rows[entity_id] = len(self._embedding_ids)
+                self._embedding_ids.append(entity_id)
+                added.append(vector)
+            else:
+                self._embeddings[row] = vector
+        if added:
+            added = np.vstack(added)
+            self._embeddings = added if self._embeddings is None else np.vstack([self._embeddings, added])
+        self._unembedded = {}
+
+    # ---------------------------------
+    # Retrieval
+    # ---------------------------------
+    def select(self, utterance):
+        """Returns entity ids relevant to the utterance, best first (at most max_entities)."""
+        scores = {}
+        for word in _tokens(utterance):
+            for entity_id in self._name_index.get(word, ()):
+                scores[entity_id] = scores.get(entity_id, 0.0) + 2.0
+            for entity_id in self._word_index.get(word, ()):
+                scores[entity_id] = scores.get(entity_id, 0.0) + 1.0
+
+        if self.embed_fn is not None and self._embeddings is not None:
+            query = np.asarray(self.embed_fn([utterance], cache=False)[0], dtype=np.float32)
+            query /= max(float(np.linalg.norm(query)), 1e-12)
+            similarities = self._embeddings @ query
+            for row in np.flatnonzero(similarities >= self.min_similarity).tolist():
+                entity_id = self._embedding_ids[row]
+                scores[entity_id] = scores.get(entity_id, 0.0) + 2.0 * float(similarities[row])
+
+        ranked = sorted(scores, key=lambda entity_id: scores[entity_id], reverse=True)
+        return ranked[:self.max_entities]
+
+    def build_context(self, utterance):
+        """Serializes the selected entities (grouped by section) and their links as compact JSON."""
+        context = {}
+        selected = set()
+        text = "{}"
+        for entity_id in self.select(utterance):
+            context.setdefault(self.sections[entity_id], []).append(self.entities[entity_id])
+            candidate = json.dumps(context, ensure_ascii=False, separators=(",", ":"))
+            if len(candidate) > self.max_chars:
+                context[self.sections[entity_id]].pop()
+                if not context[self.sections[entity_id]]:
+                    del context[self.sections[entity_id]]
+                break
+            selected.add(entity_id)
+            text = candidate
+
+        keys = set()
+        for entity_id in selected:
+            keys |= self._links_by_entity.get(entity_id, set())
+        for key in sorted(keys, key=str):
+            if key[0] in selected and key[1] in selected:
+                section, link = self.links[key]
+                context.setdefault(section, []).append(link)
+                candidate = json.dumps(context, ensure_ascii=False, separators=(",", ":"))
+                if len(candidate) > self.max_chars:
+                    context[section].pop()
+                    if not context[section]:
+                        del context[section]
+                    break
+                text = candidate
+        return text
+
+# -------------------------------------
+# MemoryRelevanceRanker Class
+# -------------------------------------
+class MemoryRelevanceRanker:
+    """
+    Ranks MemoryAccess nodes for the current utterance, instead of always
+    surfacing the global top recall strengths.
+
+    score = similarity_weight * cosine(utterance, node)      (when embed_fn is given)
+          + lexical_weight    * share of the node's name words in the utterance
+          + proximity_weight  * hop_decay ** hops to a recently mentioned entity
+          + recall_weight     * recall_strength
+
+    Node embeddings are kept in one normalized float32 matrix and the link
+    graph in CSR arrays (indptr/indices over node slots), so a query is a
+    single matrix-vector product plus a k-hop walk over a handful of
+    frontier slots. Both are kept in step lazily: nodes that are new, or
+    whose name or tags changed (NodeStore.text_revision), are re-indexed and
+    re-embedded in one batch, and the adjacency is rebuilt only when links
+    change. With a cached embedder (load_text_embedder) node text is looked
+    up by hash, so a restart only encodes nodes that are new to the cache.
+
+    Once the bank reaches `exact_below` nodes the full-width product is
+    replaced by one against a PCA-reduced copy (`coarse_dim` columns); the
+    best `rerank` nodes by that estimate are then rescored exactly.
+    """
+
+    def __init__(self, memorymap, embed_fn=None, hops=2, hop_decay=0.5, recent_window=8, mention_threshold=0.5,
+                 similarity_weight=1.0, lexical_weight=0.5, proximity_weight=0.6, recall_weight=0.2,
+                 exact_below=20000, coarse_dim=64, rerank=256):
+        self.memorymap = memorymap
+        self.embed_fn = embed_fn
+        self.hops = hops
+        self.hop_decay = hop_decay
+        self.mention_threshold = mention_threshold
+        self.similarity_weight = similarity_weight
+        self.lexical_weight = lexical_weight
+        self.proximity_weight = proximity_weight
+        self.recall_weight = recall_weight
+        self.exact_below = exact_below
+        self.coarse_dim = coarse_dim
+        self.rerank = rerank
+        self.recent = deque(maxlen=recent_window)
+        self._reset(memorymap.nodes)
+        self._indexed_links = -1
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int64)
+
+    # ---------------------------------
+    # Index maintenance
+    # ---------------------------------
+    def _reset(self, store):
+        self._store = store
+        self._name_index = {}
+        self._slot_words = []
+        self._name_lengths = np.zeros(0, dtype=np.float32)
+        self._embeddings = None
+        self._basis = None
+        self._coarse = None
+        self._indexed_nodes = 0
+        self._text_version = 0
+
+    def _index_names(self, slots):
+        nodes = self.memorymap.nodes
+        lengths = []
+        for slot in slots:
+            if slot < len(self._slot_words):
+                for word in self._slot_words[slot]:
+                    self._name_index[word].discard(slot)
+            words = _tokens(nodes.names[slot])
+            for word in words:
+                self._name_index.setdefault(word, set()).add(slot)
+            if slot < len(self._slot_words):
+                self._slot_words[slot] = words
+            else:
+                self._slot_words.append(words)
+            lengths.append(max(len(words), 1))
+        return np.asarray(lengths, dtype=np.float32)
+
+    def _refresh(self):
+        nodes = self.memorymap.nodes
+        if nodes is not self._store:
+            # load_data() swapped in a new store; index it from scratch
+            self._reset(nodes)
+        count = len(nodes)
+        changed = []
+        if nodes.text_version != self._text_version:
+            changed = np.flatnonzero(nodes.text_revision[:self._indexed_nodes] > self._text_version).tolist()
+            self._text_version = nodes.text_version
+        new_slots = list(range(self._indexed_nodes, count))
+        if changed or new_slots:
+            lengths = self._index_names(changed + new_slots)
+            self._name_lengths[changed] = lengths[:len(changed)]
+            self._name_lengths = np.concatenate([self._name_lengths, lengths[len(changed):]])
+            if self.embed_fn is not None:
+                texts = [self._describe(nodes[slot]) for slot in changed + new_slots]
+                vectors = np.asarray(self.embed_fn(texts), dtype=np.float32)
+                vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+                updated, added = vectors[:len(changed)], vectors[len(changed):]
+                if changed:
+                    self._embeddings[changed] = updated
+                    if self._basis is not None:
+                        self._coarse[changed] = updated @ self._basis
+                if new_slots:
+                    self._embeddings = added if self._embeddings is None else np.vstack([self._embeddings, added])
+                    if self._basis is not None:
+                        self._coarse = np.vstack([self._coarse, added @ self._basis])
+                    elif count >= self.exact_below and self.coarse_dim < self._embeddings.shape[1]:
+                        self._fit_coarse()
+            self._indexed_nodes = count
+        if len(self.memorymap.links) != self._indexed_links or count != len(self._indptr) - 1:
+            self._build_adjacency()
+
+    def _fit_coarse(self, sample_size=4096):
+        # Principal directions of a sample; later nodes are projected onto the same basis
+        step = max(1, len(self._embeddings) // sample_size)
+        sample = self._embeddings[::step]
+        _, _, components = np.linalg.svd(sample - sample.mean(axis=0), full_matrices=False)
+        self._basis = np.ascontiguousarray(components[:self.coarse_dim].T)
+        self._coarse = self._embeddings @ self._basis
+
+    @staticmethod
+    def _describe(node):
+        tags = ", ".join(map(str, node.tags or []))
+        return f"{node.name} - {tags}" if tags else node.name
+
+    def _build_adjacency(self):
+        count = len(self.memorymap.nodes)
+        sources, targets = [], []
+        for link in self.memorymap.links:
+            source, target = self.memorymap.slot(link.source), self.memorymap.slot(link.target)
+            if source is not None and target is not None:
+                sources.append(source)
+                targets.append(target)
+        # Undirected: store each link in both directions
+        rows = np.asarray(sources + targets, dtype=np.int64)
+        cols = np.asarray(targets + sources, dtype=np.int64)
+        order = np.argsort(rows, kind="stable")
+        self._indices = cols[order]
+        self._indptr = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=count), out=self._indptr[1:])
+        self._indexed_links = len(self.memorymap.links)
+
+    # ---------------------------------
+    # Scoring
+    # ---------------------------------
+    def _lexical(self, utterance):
+        matches = {}
+        for word in _tokens(utterance):
+            for slot in self._name_index.get(word, ()):
+                matches[slot] = matches.get(slot, 0) + 1
+        if not matches:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        slots = np.fromiter(matches.keys(), dtype=np.int64, count=len(matches))
+        counts = np.fromiter(matches.values(), dtype=np.float32, count=len(matches))
+        return slots, counts / self._name_lengths[slots]
+
+    def _proximity(self, seeds, count):
+        proximity = np.zeros(count, dtype=np.float32)
+        if not len(seeds):
+            return proximity
+        visited = np.zeros(count, dtype=bool)
+        frontier = np.unique(seeds)
+        visited[frontier] = True
+        proximity[frontier] = 1.0
+        weight = 1.0
+        for _ in range(self.hops):
+            spans = [self._indices[self._indptr[slot]:self._indptr[slot + 1]] for slot in frontier]
+            if not spans:
+                break
+            frontier = np.unique(np.concatenate(spans))
+            frontier = frontier[~visited[frontier]]
+            if not len(frontier):
+                break
+            weight *= self.hop_decay
+            visited[frontier] = True
+            proximity[frontier] = weight
+        return proximity
+
+    def rank(self, utterance, top_n=2, node_type=None):
+        """
+        Returns the top_n Nodes for the utterance, best first, and remembers the
+        entities it mentions so they steer the next few turns.
+        """
+        self._refresh()
+        nodes = self.memorymap.nodes
+        count = len(nodes)
+        if not count:
+            return []
+
+        scores = self.recall_weight * nodes.recall_strength.astype(np.float32)
+
+        lexical_slots, lexical_scores = self._lexical(utterance)
+        scores[lexical_slots] += self.lexical_weight * lexical_scores
+
+        mentioned = lexical_slots[lexical_scores >= self.mention_threshold]
+        recent = [self.memorymap.slot(node_id) for node_id in self.recent]
+        seeds = np.concatenate([mentioned, np.asarray([slot for slot in recent if slot is not None], dtype=np.int64)])
+        scores += self.proximity_weight * self._proximity(seeds, count)
+
+        if node_type is not None:
+            scores[~nodes.type_mask(node_type)] = -np.inf
+
+        slots = np.arange(count)
+        if self.embed_fn is not None and self._embeddings is not None:
+            query = np.asarray(self.embed_fn([utterance], cache=False)[0], dtype=np.float32)
+            query /= max(float(np.linalg.norm(query)), 1e-12)
+            if self._coarse is None:
+                scores += self.similarity_weight * (self._embeddings @ query)
+            else:
+                estimate = scores + self.similarity_weight * (self._coarse @ (query @ self._basis))
+                keep = min(max(self.rerank, top_n), count)
+                slots = np.argpartition(-estimate, keep - 1)[:keep]
+                scores = scores[slots] + self.similarity_weight * (self._embeddings[slots] @ query)
+
+        top_n = min(top_n, len(slots))
+        best = np.argpartition(-scores, top_n - 1)[:top_n]
+        best = best[np.argsort(-scores[best])]
+        self.recent.extend(nodes.ids[slot] for slot in mentioned.tolist())
+        return [nodes[int(slots[i])] for i in best if np.isfinite(scores[i])]
@@ -1,7 +1,12 @@
 import json
 import asyncio
+import logging
 from datetime import datetime
 from swarm import Swarm, Agent
+from session_log import get_session_log_store
+from response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
 
 # -------------------------------------
 # SessionAggregator Class
@@ -43,34 +48,44 @@ class SessionAggregator:
     def get_session_data(self):
         return self.data
 
+    @classmethod
+    def from_data(cls, data):
+        """Rebuilds an aggregator from a dict previously returned by get_session_data()."""
+        aggregator = cls(data["session_id"], data["patient_id"])
+        aggregator.data = data
+        return aggregator
+
 # -------------------------------------
 # Helper to append session logs
 # -------------------------------------
-async def append_session_log(new_session_data, session_log_path="data/session_log.json"):
-    try:
-        with open(session_log_path, 'r', encoding='utf-8') as file:
-            session_log = json.load(file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        session_log = {}
-
-    if "sessions" not in session_log or not isinstance(session_log.get("sessions"), list):
-        session_log["sessions"] = []
-
-    session_log["sessions"].append(new_session_data)
-
-    with open(session_log_path, 'w', encoding='utf-8') as file:
-        json.dump(session_log, file, indent=4, ensure_ascii=False)
-
+async def append_session_log(new_session_data, session_log_dir="data/session_log"):
+    """
+    Appends one session to the append-only session log store.
+    The write is a single line append, so its cost does not grow with history.
+    Use `export_session_log` to produce the legacy session_log.json document.
+    """
+    store = get_session_log_store(session_log_dir)
+    await asyncio.to_thread(store.append, new_session_data)
     return "Session log updated successfully."
 
+def export_session_log(session_log_path="data/session_log.json", session_log_dir="data/session_log"):
+    return get_session_log_store(session_log_dir).export(session_log_path)
+
 # -------------------------------------
 # TherapyAgents class
 # -------------------------------------
 class TherapyAgents:
-    def __init__(self):
+    def __init__(self, response_cache=None, max_concurrency=8):
         self.client = Swarm()
         self.agents = {}
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+        # Shared by every Session built on these agents, so it bounds model calls across
+        # concurrent requests; a timed-out call keeps its slot until its thread returns
+        self.max_concurrency = max(1, max_concurrency)
+        self.call_slots = asyncio.Semaphore(self.max_concurrency)
         self.initialize_agents()
+        # SRT candidates are ranked by experts, so they must be sampled fresh every time
+        self.response_cache.disable(self.agents['srt_agent'].name)
 
     def reminiscence():
         # Stub for reminiscence therapy
@@ -181,17 +196,12 @@ class TherapyAgents:
 # -------------------------------------
 # Optional: Load previous session summary
 # -------------------------------------
-def load_previous_session_summary(patient_id, session_log_path="data/session_log.json"):
+def load_previous_session_summary(patient_id, session_log_dir="data/session_log"):
+    session = get_session_log_store(session_log_dir).latest_session(patient_id)
     try:
-        with open(session_log_path, 'r', encoding='utf-8') as file:
-            session_log = json.load(file)
-        sessions = session_log.get("sessions", [])
-        for session in reversed(sessions):
-            if session["patient_id"] == patient_id:
-                return session["session_summary"].get("clinician_recommendation")
-    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return session["session_summary"].get("clinician_recommendation") if session else None
+    except (KeyError, AttributeError):
         return None
-    return None
 
 # -------------------------------------
 # (Optional) simulate asynchronous user input
@@ -205,9 +215,12 @@ async def get_patient_response():
 # Session class
 # -------------------------------------
 class Session:
-    def __init__(self, therapy_agents):
+    def __init__(self, therapy_agents, timeout=30.0):
         self.client = therapy_agents.client
         self.agents = therapy_agents.agents
+        self.response_cache = therapy_agents.response_cache
+        self.call_slots = therapy_agents.call_slots
+        self.timeout = timeout
 
     async def engage_patient(self, patient_prompt, patient_id="patient_1"):
         """
@@ -257,18 +270,61 @@ class Session:
 
         return "Session COMPLETE"
 
-    async def generate_multiple_responses(self, agent_name: str, prompt: str, num_responses=3):
+    async def generate_multiple_responses(self, agent_name: str, prompt: str, num_responses=3, timeout=None):
         """
         Runs the same agent multiple times to produce distinct responses.
-        Alternatively, you could instruct one agent to produce multiple variations 
-        in a single prompt, or use multiple agents.
+        The candidate calls are fanned out concurrently (at most
+        TherapyAgents.max_concurrency model calls in flight across all
+        sessions), so latency approaches a single round-trip. A candidate
+        waits at most `timeout` seconds for a slot and `timeout` seconds for
+        its reply; calls that fail or time out are dropped and the
+        successful candidates are returned in order. A timed-out call keeps
+        its slot until its worker thread actually returns, so abandoned
+        calls still count against the shared limit.
+        Single-response calls for prompts this agent already answered are
+        served from the response cache; multi-candidate calls always sample
+        fresh, since the candidates are meant to differ.
         """
+        agent = self.agents[agent_name]
+        history = [{"role": "user", "content": prompt}]
+        use_cache = num_responses == 1
+        if use_cache:
+            cached = self.response_cache.get(agent, history)
+            if cached is not None:
+                return cached[:1]
+
+        timeout = timeout if timeout is not None else self.timeout
+        semaphore = self.call_slots
+
+        def release_slot(call):
+            semaphore.release()
+            if not call.cancelled():
+                call.exception()  # consumed here in case the caller already gave up on it
+
+        async def run_candidate():
+            if timeout:
+                await asyncio.wait_for(semaphore.acquire(), timeout)
+            else:
+                await semaphore.acquire()
+            call = asyncio.ensure_future(asyncio.to_thread(self.client.run, agent, list(history)))
+            call.add_done_callback(release_slot)
+            # shield() so a timeout stops the wait, not the task that owns the slot
+            response = await asyncio.wait_for(asyncio.shield(call), timeout) if timeout else await call
+            return response.messages[-1]['content'].strip()
+
+        results = await asyncio.gather(
+            *(run_candidate() for _ in range(num_responses)),
+            return_exceptions=True
+        )
+
         responses = []
-        for _ in range(num_responses):
-            history = [{"role": "user", "content": prompt}]
-            response = await asyncio.to_thread(self.client.run, self.agents[agent_name], history)
-            agent_reply = response.messages[-1]['content'].strip()
-            responses.append(agent_reply)
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.warning("Candidate generation for %s failed: %r", agent_name, result)
+            else:
+                responses.append(result)
+        if use_cache:
+            self.response_cache.put(agent, history, responses)
         return responses
 
 # -------------------------------------
@@ -8,6 +8,7 @@ import io
 from swarm import Swarm, Agent
 import time
 from MemoryManager import MemoryAccess
+from memory_retrieval import MemoryBankRetriever, MemoryRelevanceRanker, load_text_embedder
 from voice import VoiceChat
 
 client = Swarm()
@@ -30,39 +31,22 @@ def load_memory():
 # Load memory at script start
 memory_bank = load_memory()
 
+# Index the bank once; Agent P only sees the entries relevant to each utterance
+text_embedder = load_text_embedder()
+memory_retriever = MemoryBankRetriever(memory_bank, embed_fn=text_embedder)
+# Picks the memory to bring up from what the patient is talking about
+memory_ranker = MemoryRelevanceRanker(memorymap, embed_fn=text_embedder)
+
 def store_memory(new_memory):
     """
-    Update the existing graph data JSON file with new memory nodes and links.
+    Merge new memory nodes and links into the resident memory map.
+
+    Only the delta is applied (new entities, changed recall strengths); it is
+    journalled immediately and folded into the graph data JSON file on flush.
     """
     print(f"New Memory: {new_memory}")
-
-    # Load current memory bank
-    memory_bank = load_memory()
-
-    # Ensure 'nodes' and 'links' keys exist
-    if "nodes" not in memory_bank:
-        memory_bank["nodes"] = []
-    if "links" not in memory_bank:
-        memory_bank["links"] = []
-
-    # Append new nodes if not already present
-    existing_node_ids = {node["id"] for node in memory_bank["nodes"]}
-    for new_node in new_memory.get("nodes", []):
-        if new_node["id"] not in existing_node_ids:
-            memory_bank["nodes"].append(new_node)
-            existing_node_ids.add(new_node["id"])
-
-    # Append new links if not already present
-    existing_links = {(link["source"], link["target"]) for link in memory_bank["links"]}
-    for new_link in new_memory.get("links", []):
-        link_tuple = (new_link["source"], new_link["target"])
-        if link_tuple not in existing_links:
-            memory_bank["links"].append(new_link)
-            existing_links.add(link_tuple)
-
-    # Save updated memory bank
-    with open(MEMORY_FILE, 'w', encoding='utf-8') as file:
-        json.dump(memory_bank, file, indent=4, ensure_ascii=False)
+    counts = memorymap.merge(new_memory)
+    print(f"Memory merged: {counts}")
 
     print("Memory successfully updated.")
 
@@ -90,9 +74,10 @@ agent_s = Agent(
 )
 
 
-agent_p = Agent(
-    name="Agent P",
-    instructions=f"""
+def agent_p_instructions(context_variables):
+    """Builds Agent P's prompt around the memory-bank slice retrieved for the current utterance."""
+    memory_context = context_variables.get("memory_context", "{}")
+    return f"""
     Agent Instructions: Memory Structuring, Updating, and Incremental JSON Completion
 
     Role:
@@ -102,8 +87,9 @@ agent_p = Agent(
         - Begin by analyzing the provided memory.
         - Check existing entries to prevent duplication and maintain consistency.
 
-    **Existing Memory Bank:**
-    {json.dumps(memory_bank, indent=4)}
+    **Relevant Entries From The Existing Memory Bank:**
+    (Only the people, events, locations and connections related to this memory are shown.)
+    {memory_context}
 
     ---
     **Incremental Memory Update Workflow:**
@@ -196,6 +182,10 @@ agent_p = Agent(
 
     Ensure each memory prompt incrementally expands and accurately refines the memory bank.
     """
+
+agent_p = Agent(
+    name="Agent P",
+    instructions=agent_p_instructions
 )
 
 
@@ -269,20 +259,14 @@ while True:
     else:
         user_input = input("Enter a statement (or type 'exit' to quit): ")
 
-    selected_memory = memorymap.get_highest_recall_memories()
+    selected_memory = memory_ranker.rank(user_input, top_n=2)
     print(selected_memory)
     selected_memory_text = ", ".join([m[1] for m in selected_memory]) if selected_memory else "No memory found"
     print(selected_memory_text) 
 
-    
-    # user_input = input("Enter a statement (or type 'exit' to quit): ")
-    selected_memory = memorymap.get_highest_recall_memories()
-    print(selected_memory)
-    selected_memory_text = ", ".join([m[1] for m in selected_memory]) if selected_memory else "No memory found"
-    # print(selected_memory_text) 
-
     if user_input.lower() == "exit":
         print("Exiting...")
+        memorymap.close()
         break
 
     # Run Agent S
@@ -299,13 +283,18 @@ while True:
 
         # If Agent S classifies it as a memory, trigger Agent P
         if classification.strip().lower() == "memory":
-            response_p = client.run(agent=agent_p, messages=[{"role": "user", "content": user_input}])
+            response_p = client.run(
+                agent=agent_p,
+                messages=[{"role": "user", "content": user_input}],
+                context_variables={"memory_context": memory_retriever.build_context(user_input)}
+            )
 
             if response_p and response_p.messages[-1]["content"]:
                 try:
                     processed_memory = json.loads(response_p.messages[-1]["content"])
                     if isinstance(processed_memory, dict):
                         store_memory(processed_memory)
+                        memory_retriever.update(processed_memory)
                     else:
                         print("Processed memory isn't a valid JSON object.")
                 except json.JSONDecodeError:
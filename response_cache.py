@@ -0,0 +1,145 @@
+# response_cache.py
+
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+
+def _hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+# -------------------------------------
+# ResponseCache Class
+# -------------------------------------
+class ResponseCache:
+    """
+    Memoizes agent replies keyed by (agent name, instructions hash, message history).
+
+    Each entry holds a list of replies so multi-candidate calls can be served
+    from one entry. Entries expire after `ttl` seconds and the least recently
+    used are evicted beyond `max_entries`. If `embed_fn` is given (a callable
+    mapping text to a vector), an exact miss falls back to the most similar
+    cached history for the same agent and instructions, provided its cosine
+    similarity is at least `similarity_threshold`.
+
+    Caching is switchable per agent with enable()/disable(), for agents where
+    fresh sampling (candidate diversity) matters more than latency.
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600.0, embed_fn=None, similarity_threshold=0.95, default_enabled=True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.default_enabled = default_enabled
+        self._overrides = {}
+        self._entries = OrderedDict()
+        self._embeddings = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "near_hits": 0, "misses": 0}
+
+    # ---------------------------------
+    # Per-agent switches
+    # ---------------------------------
+    def enable(self, agent_name):
+        self._overrides[agent_name] = True
+
+    def disable(self, agent_name):
+        self._overrides[agent_name] = False
+
+    def is_enabled(self, agent):
+        return self._overrides.get(agent.name, self.default_enabled)
+
+    # ---------------------------------
+    # Keys
+    # ---------------------------------
+    @staticmethod
+    def _scope(agent):
+        return f"{agent.name}:{_hash(agent.instructions if isinstance(agent.instructions, str) else repr(agent.instructions))}"
+
+    def _key(self, agent, messages):
+        history = json.dumps(messages, sort_keys=True, ensure_ascii=False)
+        return f"{self._scope(agent)}:{_hash(history)}"
+
+    @staticmethod
+    def _history_text(messages):
+        return "\n".join(str(message.get("content", "")) for message in messages)
+
+    # ---------------------------------
+    # Lookup / store
+    # ---------------------------------
+    def _evict(self, key):
+        self._entries.pop(key, None)
+        self._embeddings.pop(key, None)
+
+    def _live_entry(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl is not None and now - entry["created"] > self.ttl:
+            self._evict(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, agent, messages, min_responses=1):
+        """Returns the cached replies for this call, or None on a miss or if fewer than `min_responses` are cached."""
+        if not self.is_enabled(agent):
+            return None
+
+        key = self._key(agent, messages)
+        query = None
+        if self.embed_fn is not None:
+            with self._lock:
+                has_exact = key in self._entries
+            if not has_exact:
+                query = self.embed_fn(self._history_text(messages))
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._live_entry(key, now)
+            near = False
+            if entry is None and query is not None:
+                scope = self._scope(agent) + ":"
+                best_key, best_score = None, self.similarity_threshold
+                for candidate_key, embedding in self._embeddings.items():
+                    if candidate_key.startswith(scope):
+                        score = _cosine(query, embedding)
+                        if score >= best_score:
+                            best_key, best_score = candidate_key, score
+                if best_key is not None:
+                    entry = self._live_entry(best_key, now)
+                    near = entry is not None
+
+            if entry is None or len(entry["responses"]) < min_responses:
+                self.stats["misses"] += 1
+                return None
+            self.stats["near_hits" if near else "hits"] += 1
+            return list(entry["responses"])
+
+    def put(self, agent, messages, responses):
+        if not self.is_enabled(agent) or not responses:
+            return
+
+        key = self._key(agent, messages)
+        embedding = self.embed_fn(self._history_text(messages)) if self.embed_fn is not None else None
+        with self._lock:
+            self._entries[key] = {"responses": list(responses), "created": time.monotonic()}
+            self._entries.move_to_end(key)
+            if embedding is not None:
+                self._embeddings[key] = embedding
+            while len(self._entries) > self.max_entries:
+                oldest, _ = self._entries.popitem(last=False)
+                self._embeddings.pop(oldest, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._embeddings.clear()
@@ -0,0 +1,345 @@
+# session_log.py
+
+import json
+import os
+import threading
+
+from group_commit import FileLock
+
+# -------------------------------------
+# SessionLogStore Class
+# -------------------------------------
+class SessionLogStore:
+    """
+    Append-only, log-structured store for session logs.
+
+    Sessions are written as one JSON line each into numbered segment files
+    (segment_000001.jsonl, ...). Only the newest segment is ever written to;
+    once it grows past `max_segment_bytes` it is sealed and a new one is
+    started. An in-memory index maps each patient (and each session_id) to
+    the (segment, offset, length) of its records, so reads seek straight to
+    the bytes they need instead of parsing the whole history.
+
+    Appending is constant time regardless of how many sessions exist.
+    `compact()` merges sealed segments and drops superseded records;
+    `export()` writes the legacy {"sessions": [...]} document on demand.
+
+    Several processes (API workers) may share one directory. Every append,
+    rollover, compaction and read holds an exclusive lock on the directory
+    (store.lock) and first catches up with the others: new bytes at segment
+    tails are indexed, and a bumped compaction generation (generation.txt)
+    triggers a full reload, since compaction rewrites and removes segments.
+    """
+
+    SEGMENT_PREFIX = "segment_"
+    SEGMENT_SUFFIX = ".jsonl"
+    LEGACY_MARKER = "legacy_imported"
+
+    def __init__(self, directory="data/session_log", max_segment_bytes=4 * 1024 * 1024, compact_after=8):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.compact_after = compact_after
+        self._lock = threading.Lock()
+        self._patient_index = {}
+        self._session_index = {}
+        self._segments = []
+        self._scanned = {}  # segment_no -> bytes of that segment already indexed
+        self._generation = None
+        os.makedirs(self.directory, exist_ok=True)
+        self._dir_lock = FileLock(os.path.join(self.directory, "store"))
+        self._generation_path = os.path.join(self.directory, "generation.txt")
+        with self._lock, self._dir_lock:
+            self._load_index()
+
+    # ---------------------------------
+    # Segment helpers
+    # ---------------------------------
+    def _segment_path(self, segment_no):
+        return os.path.join(self.directory, f"{self.SEGMENT_PREFIX}{segment_no:06d}{self.SEGMENT_SUFFIX}")
+
+    def _list_segments(self):
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith(self.SEGMENT_PREFIX) and name.endswith(self.SEGMENT_SUFFIX):
+                number = name[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)]
+                if number.isdigit():
+                    segments.append(int(number))
+        return sorted(segments)
+
+    def _index_record(self, record, location):
+        patient_id = record.get("patient_id")
+        session_id = record.get("session_id")
+        self._patient_index.setdefault(patient_id, []).append(location)
+        if session_id is not None:
+            self._session_index[session_id] = location
+
+    def _read_generation(self):
+        try:
+            with open(self._generation_path, "r", encoding="utf-8") as file:
+                return int(file.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _bump_generation(self):
+        tmp_path = self._generation_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(str(self._read_generation() + 1))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self._generation_path)
+
+    def _scan(self, segment_no):
+        """Indexes the complete lines appended to a segment since it was last scanned."""
+        offset = self._scanned.get(segment_no, 0)
+        try:
+            file = open(self._segment_path(segment_no), "rb")
+        except FileNotFoundError:
+            return
+        with file:
+            file.seek(offset)
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break  # torn write; left for _load_index to repair
+                length = len(line)
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    record = None
+                if isinstance(record, dict):
+                    self._index_record(record, (segment_no, offset, length))
+                offset += length
+        self._scanned[segment_no] = offset
+
+    def _load_index(self):
+        """Rebuilds the offset index by scanning every segment. Caller holds both locks."""
+        self._patient_index = {}
+        self._session_index = {}
+        self._scanned = {}
+        self._generation = self._read_generation()
+        self._segments = self._list_segments()
+        if not self._segments:
+            self._segments = [1]
+            open(self._segment_path(1), "ab").close()
+
+        for segment_no in self._segments:
+            self._scan(segment_no)
+
+        # Drop a torn trailing write (e.g. crash mid-append) so the next
+        # record starts on a clean line. Safe under the directory lock: live
+        # writers only write while holding it.
+        active = self._segments[-1]
+        with open(self._segment_path(active), "rb+") as file:
+            if file.seek(0, os.SEEK_END) > self._scanned.get(active, 0):
+                file.truncate(self._scanned.get(active, 0))
+
+    def _sync(self):
+        """Catches up with appends, rollovers and compactions by other processes. Caller holds both locks."""
+        if self._read_generation() != self._generation:
+            self._load_index()
+            return
+        segments = self._list_segments()
+        if not segments:
+            self._load_index()
+            return
+        for segment_no in segments:
+            self._scan(segment_no)
+        self._segments = segments
+
+    def _read_location(self, location):
+        segment_no, offset, length = location
+        with open(self._segment_path(segment_no), "rb") as file:
+            file.seek(offset)
+            return json.loads(file.read(length))
+
+    # ---------------------------------
+    # Public API
+    # ---------------------------------
+    def append(self, session_data):
+        """Appends one session record to the active segment."""
+        self.append_many([session_data])
+
+    def append_many(self, records):
+        """
+        Appends a batch of session records with a single write and fsync,
+        so a group of queued writes costs one disk flush.
+        """
+        if not records:
+            return
+        with self._lock, self._dir_lock:
+            self._sync()
+            self._append_locked(records)
+
+    def _append_locked(self, records):
+        lines = [(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8") for record in records]
+        if not lines:
+            return
+        segment_no = self._segments[-1]
+        with open(self._segment_path(segment_no), "ab") as file:
+            # Another process may have appended since our last scan; the end is only stable under the lock
+            offset = file.seek(0, os.SEEK_END)
+            file.write(b"".join(lines))
+            file.flush()
+            os.fsync(file.fileno())
+        for record, line in zip(records, lines):
+            self._index_record(record, (segment_no, offset, len(line)))
+            offset += len(line)
+        self._scanned[segment_no] = offset
+
+        if offset >= self.max_segment_bytes:
+            self._segments.append(segment_no + 1)
+            open(self._segment_path(segment_no + 1), "ab").close()
+            if len(self._segments) - 1 >= self.compact_after:
+                self._compact_locked()
+
+    def get_session(self, session_id):
+        with self._lock, self._dir_lock:
+            self._sync()
+            location = self._session_index.get(session_id)
+            return self._read_location(location) if location else None
+
+    def get_patient_sessions(self, patient_id, limit=None):
+        """Returns the patient's sessions in append order (the last `limit` if given)."""
+        with self._lock, self._dir_lock:
+            self._sync()
+            locations = list(self._patient_index.get(patient_id, []))
+            if limit is not None:
+                locations = locations[-limit:] if limit > 0 else []
+            return [self._read_location(location) for location in locations]
+
+    def latest_session(self, patient_id):
+        sessions = self.get_patient_sessions(patient_id, limit=1)
+        return sessions[0] if sessions else None
+
+    def iter_sessions(self):
+        """Yields every stored session in append order."""
+        # Read under the lock so a concurrent compaction cannot remove segments mid-scan
+        records = []
+        with self._lock, self._dir_lock:
+            self._sync()
+            for segment_no in self._segments:
+                with open(self._segment_path(segment_no), "rb") as file:
+                    for line in file:
+                        if not line.endswith(b"\n"):
+                            break
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        if isinstance(record, dict):
+                            records.append(record)
+        yield from records
+
+    def compact(self):
+        """Merges all sealed segments into one, keeping the newest record per session_id."""
+        with self._lock, self._dir_lock:
+            self._sync()
+            self._compact_locked()
+
+    def _compact_locked(self):
+        sealed = self._segments[:-1]
+        if len(sealed) < 2:
+            return
+
+        live = {location for location in self._session_index.values()}
+        target_no = sealed[0]
+        tmp_path = self._segment_path(target_no) + ".tmp"
+        with open(tmp_path, "wb") as out:
+            for segment_no in sealed:
+                with open(self._segment_path(segment_no), "rb") as file:
+                    offset = 0
+                    for line in file:
+                        length = len(line)
+                        location = (segment_no, offset, length)
+                        offset += length
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        if not isinstance(record, dict):
+                            continue
+                        if record.get("session_id") is not None and location not in live:
+                            continue
+                        out.write(line)
+            out.flush()
+            os.fsync(out.fileno())
+
+        os.replace(tmp_path, self._segment_path(target_no))
+        for segment_no in sealed[1:]:
+            os.remove(self._segment_path(segment_no))
+        # Other processes' offsets into these segments are now invalid; tell them to reload
+        self._bump_generation()
+        self._load_index()
+
+    def export(self, path="data/session_log.json"):
+        """Writes all sessions to `path` in the legacy {"sessions": [...]} format."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"sessions": list(self.iter_sessions())}, file, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def _read_legacy(path):
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                session_log = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+        sessions = session_log.get("sessions", []) if isinstance(session_log, dict) else []
+        return [session for session in sessions if isinstance(session, dict)]
+
+    def import_json(self, path):
+        """Appends every session from a legacy {"sessions": [...]} file. Returns the count imported."""
+        sessions = self._read_legacy(path)
+        self.append_many(sessions)
+        return len(sessions)
+
+    def seed_from_legacy(self, path):
+        """
+        Imports a legacy {"sessions": [...]} file into this directory exactly once.
+
+        Runs under the directory lock and finishes by writing a marker file
+        (legacy_imported), so concurrent workers never import it twice. An
+        import cut short by a crash is completed by the next caller, which
+        skips sessions whose session_id is already stored. Returns the count imported.
+        """
+        marker_path = os.path.join(self.directory, self.LEGACY_MARKER)
+        with self._lock, self._dir_lock:
+            if os.path.exists(marker_path):
+                return 0
+            self._sync()
+            sessions = [session for session in self._read_legacy(path)
+                        if session.get("session_id") is None or session["session_id"] not in self._session_index]
+            # One write and fsync for the whole import; a torn tail is dropped on the next load
+            self._append_locked(sessions)
+            with open(marker_path, "w", encoding="utf-8") as file:
+                file.write(str(len(sessions)))
+                file.flush()
+                os.fsync(file.fileno())
+            return len(sessions)
+
+    def __len__(self):
+        with self._lock, self._dir_lock:
+            self._sync()
+            return sum(len(locations) for locations in self._patient_index.values())
+
+# -------------------------------------
+# Shared store instances
+# -------------------------------------
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_session_log_store(directory="data/session_log", legacy_path="data/session_log.json"):
+    """
+    Returns the process-wide store for `directory`, creating it on first use.
+    The directory is seeded once (across all processes) from the legacy JSON
+    log if one exists; see SessionLogStore.seed_from_legacy.
+    """
+    with _stores_lock:
+        store = _stores.get(directory)
+        if store is None:
+            store = SessionLogStore(directory)
+            if legacy_path:
+                store.seed_from_legacy(legacy_path)
+            _stores[directory] = store
+        return store
@@ -0,0 +1,242 @@
+# session_store.py
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from orchestration import SessionAggregator
+
+class SessionConflictError(Exception):
+    """Raised by put() when the session was changed by another writer since it was loaded."""
+
+# -------------------------------------
+# SessionStore Class
+# -------------------------------------
+class SessionStore:
+    """
+    Bounded store for live SessionAggregators, shared by every API worker on a host.
+
+    The authoritative copy of each session is a row in a SQLite database in
+    WAL mode, so several uvicorn workers can read and write it concurrently.
+    Every `put()` writes through as a compare-and-swap on the row's version:
+    it only succeeds if the row still has the version the aggregator was
+    loaded at, otherwise it raises SessionConflictError. `update()` wraps
+    that in a reload / reapply / retry loop and is what endpoints should
+    use, so concurrent turns on different workers never lose a change. Each worker
+    also keeps up to `max_resident` sessions in an in-memory LRU; a resident
+    copy is served only while its version still matches the row, so a
+    session updated by another worker is reloaded instead of going stale.
+
+    Sessions idle for `idle_seconds` are dropped from memory (they stay on
+    disk), and sessions idle for `ttl_seconds` are deleted outright.
+    `sweep()` applies both limits; the app runs it on a timer.
+    """
+
+    def __init__(self, path: str = "data/sessions.db", ttl_seconds: float = 6 * 3600,
+                 max_resident: int = 256, idle_seconds: float = 300):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_resident = max_resident
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._resident = OrderedDict()  # session_id -> (aggregator, version, last_access)
+        self._versions = weakref.WeakKeyDictionary()  # aggregator -> row version it was loaded at / last wrote
+        self._update_locks = weakref.WeakValueDictionary()  # session_id -> asyncio.Lock held by update()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "conflicts": 0, "spilled": 0, "expired": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " patient_id TEXT,"
+            " data TEXT NOT NULL,"
+            " version INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+
+    # ---------------------------------
+    # Resident LRU
+    # ---------------------------------
+    def _remember(self, session_id, aggregator, version):
+        self._resident[session_id] = (aggregator, version, time.monotonic())
+        self._resident.move_to_end(session_id)
+        while len(self._resident) > self.max_resident:
+            self._resident.popitem(last=False)
+            self.stats["spilled"] += 1
+
+    # ---------------------------------
+    # Blocking operations (run via asyncio.to_thread)
+    # ---------------------------------
+    def _get(self, session_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT version FROM sessions WHERE session_id = ? AND updated_at >= ?",
+                (session_id, time.time() - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                self._resident.pop(session_id, None)
+                self.stats["misses"] += 1
+                return None
+
+            cached = self._resident.get(session_id)
+            if cached is not None and cached[1] == row[0]:
+                self._remember(session_id, cached[0], cached[1])
+                self.stats["memory_hits"] += 1
+                return cached[0]
+
+            data, version = self._db.execute(
+                "SELECT data, version FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            aggregator = SessionAggregator.from_data(json.loads(data))
+            self._versions[aggregator] = version
+            self._remember(session_id, aggregator, version)
+            self.stats["disk_hits"] += 1
+            return aggregator
+
+    def _put(self, aggregator):
+        data = aggregator.get_session_data()
+        session_id = data["session_id"]
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        now = time.time()
+        with self._lock:
+            expected = self._versions.get(aggregator)
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if expected is None:
+                    # New session: insert, or take over a row that has expired but not been swept yet
+                    changed = self._db.execute(
+                        "INSERT INTO sessions (session_id, patient_id, data, version, updated_at) VALUES (?, ?, ?, 1, ?)"
+                        " ON CONFLICT(session_id) DO UPDATE SET"
+                        " patient_id = excluded.patient_id, data = excluded.data,"
+                        " version = sessions.version + 1, updated_at = excluded.updated_at"
+                        " WHERE sessions.updated_at < ?",
+                        (session_id, data.get("patient_id"), payload, now, now - self.ttl_seconds)
+                    ).rowcount
+                else:
+                    changed = self._db.execute(
+                        "UPDATE sessions SET patient_id = ?, data = ?, version = version + 1, updated_at = ?"
+                        " WHERE session_id = ? AND version = ?",
+                        (data.get("patient_id"), payload, now, session_id, expected)
+                    ).rowcount
+                version = None
+                if changed:
+                    version = self._db.execute(
+                        "SELECT version FROM sessions WHERE session_id = ?", (session_id,)
+                    ).fetchone()[0]
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            if version is None:
+                self._resident.pop(session_id, None)
+                self.stats["conflicts"] += 1
+                if expected is None:
+                    raise SessionConflictError(f"Session {session_id} already exists.")
+                raise SessionConflictError(f"Session {session_id} was modified by another writer.")
+            self._versions[aggregator] = version
+            self._remember(session_id, aggregator, version)
+            self.stats["stores"] += 1
+
+    def _delete(self, session_id):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._resident.pop(session_id, None)
+
+    def _sweep(self):
+        with self._lock:
+            expired = self._db.execute(
+                "DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+            self.stats["expired"] += max(expired, 0)
+            idle_before = time.monotonic() - self.idle_seconds
+            idle = [session_id for session_id, (_, _, last_access) in self._resident.items() if last_access < idle_before]
+            for session_id in idle:
+                del self._resident[session_id]
+            self.stats["spilled"] += len(idle)
+            return {"expired": max(expired, 0), "spilled": len(idle)}
+
+    # ---------------------------------
+    # Async API
+    # ---------------------------------
+    async def get(self, session_id: str) -> Optional[SessionAggregator]:
+        return await asyncio.to_thread(self._get, session_id)
+
+    async def put(self, aggregator: SessionAggregator):
+        """
+        Persists the aggregator's current state. Raises SessionConflictError if the
+        session changed since this aggregator was loaded (see update()).
+        """
+        await asyncio.to_thread(self._put, aggregator)
+
+    async def update(self, session_id: str, patient_id: str,
+                     mutate: Callable[[SessionAggregator], None], create: bool = True,
+                     retries: int = 5) -> Optional[SessionAggregator]:
+        """
+        Loads the session (creating it if `create`), applies `mutate` and saves it.
+        New sessions should use create() with a fresh id instead, which never
+        joins an existing row.
+        On a version conflict the session is reloaded and `mutate` is applied
+        again, so `mutate` must only depend on the aggregator it is given.
+        Returns the saved aggregator, or None if it doesn't exist and `create` is False.
+        """
+        # Updates from this worker take turns, since they share the resident aggregator;
+        # conflicts can then only come from other workers, whose changes the reload picks up.
+        lock = self._update_locks.get(session_id)
+        if lock is None:
+            lock = self._update_locks[session_id] = asyncio.Lock()
+        async with lock:
+            for _ in range(retries):
+                aggregator = await self.get(session_id)
+                if aggregator is None:
+                    if not create:
+                        return None
+                    aggregator = SessionAggregator(session_id, patient_id)
+                mutate(aggregator)
+                try:
+                    await self.put(aggregator)
+                    return aggregator
+                except SessionConflictError:
+                    continue
+        raise SessionConflictError(f"Session {session_id} kept changing; gave up after {retries} attempts.")
+
+    async def create(self, session_id: str, patient_id: str,
+                     mutate: Optional[Callable[[SessionAggregator], None]] = None) -> SessionAggregator:
+        """
+        Stores a brand-new session, with `mutate` applied first. Raises
+        SessionConflictError if a live session with this id already exists,
+        so a new session can never be merged into someone else's.
+        """
+        aggregator = SessionAggregator(session_id, patient_id)
+        if mutate is not None:
+            mutate(aggregator)
+        await self.put(aggregator)
+        return aggregator
+
+    async def delete(self, session_id: str):
+        await asyncio.to_thread(self._delete, session_id)
+
+    async def sweep(self) -> dict:
+        """Deletes expired sessions and drops idle ones from memory."""
+        return await asyncio.to_thread(self._sweep)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stored = self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            return {**self.stats, "resident": len(self._resident), "stored": stored}
+
+    def close(self):
+        with self._lock:
+            self._resident.clear()
+            self._db.close()
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from elevenlabs_tts import ElevenLabsTTS
+from tts_cache import TTSCache, CachedTTS
+
+FIRST_CHUNK = b"ID3" + b"\x00" * 1021
+REST = b"\xff\xfb" * 2048
+
+class FakeTTSServer:
+    """
+    Minimal chunked-transfer HTTP server standing in for ElevenLabs.
+
+    It sends the first MP3 chunk, then holds the rest of the body until the
+    test signals that the client has received that chunk, so a client that
+    buffers the whole response would never see it.
+    """
+
+    def __init__(self):
+        self.first_chunk_received = asyncio.Event()
+        self.finished = False
+        self.paths = []
+        self.server = None
+
+    async def handle(self, reader, writer):
+        request_line = await reader.readline()
+        self.paths.append(request_line.split()[1].decode())
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        await reader.readexactly(length)
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: audio/mpeg\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        writer.write(b"%x\r\n%s\r\n" % (len(FIRST_CHUNK), FIRST_CHUNK))
+        await writer.drain()
+
+        await asyncio.wait_for(self.first_chunk_received.wait(), 5)
+        self.finished = True
+        writer.write(b"%x\r\n%s\r\n0\r\n\r\n" % (len(REST), REST))
+        await writer.drain()
+        writer.close()
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        self.base_url = f"http://{host}:{port}"
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.server.close()
+        await self.server.wait_closed()
+
+async def stream_through(wrap):
+    async with FakeTTSServer() as upstream:
+        client = ElevenLabsTTS(api_key="test-key", voice_id="voice-1", base_url=upstream.base_url)
+        tts = wrap(client)
+        try:
+            chunks = await tts.stream_speech("Hello there", chunk_size=len(FIRST_CHUNK))
+            first = await asyncio.wait_for(chunks.__anext__(), 5)
+            finished_before_first_chunk = upstream.finished
+            upstream.first_chunk_received.set()
+            rest = b"".join([chunk async for chunk in chunks])
+        finally:
+            await tts.aclose()
+        return upstream, first, finished_before_first_chunk, rest
+
+@pytest.mark.parametrize("wrap", [
+    pytest.param(lambda client: client, id="elevenlabs"),
+    pytest.param(lambda client: CachedTTS(client, TTSCache(directory=None)), id="cached"),
+])
+def test_first_chunk_arrives_before_upstream_finishes(wrap):
+    upstream, first, finished_before_first_chunk, rest = asyncio.run(stream_through(wrap))
+
+    assert upstream.paths == ["/v1/text-to-speech/voice-1/stream"]
+    assert first == FIRST_CHUNK
+    assert not finished_before_first_chunk
+    assert first + rest == FIRST_CHUNK + REST
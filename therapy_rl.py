@@ -1,9 +1,11 @@
 import asyncio
 from swarm import Swarm, Agent
+from response_cache import ResponseCache
 
 class MemoryTherapyRL:
-    def __init__(self):
+    def __init__(self, response_cache=None):
         self.client = Swarm()
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
         # Initialize three agents with different instructions for memory therapy
         self.agents = {
             "agent_1": Agent(
@@ -38,8 +40,13 @@ class MemoryTherapyRL:
         # Each agent is given the same prompt to generate its response.
         # The conversation history is a simple list with the patient prompt.
         history = [{"role": "user", "content": prompt}]
-        response = await asyncio.to_thread(self.client.run, agent, history)
-        return response.messages[-1]['content'].strip()
+        cached = self.response_cache.get(agent, history)
+        if cached is not None:
+            return cached[0]
+        response = await asyncio.to_thread(self.client.run, agent, list(history))
+        reply = response.messages[-1]['content'].strip()
+        self.response_cache.put(agent, history, [reply])
+        return reply
     
     async def generate_responses(self, prompt):
         responses = {}
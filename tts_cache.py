@@ -0,0 +1,179 @@
+# tts_cache.py
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalizes and collapses whitespace so trivially different strings share an entry."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+def cache_key(voice_id: str, voice_settings: dict, text: str) -> str:
+    material = json.dumps(
+        {"voice_id": voice_id, "voice_settings": voice_settings, "text": normalize_text(text)},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+# -------------------------------------
+# TTSCache Class
+# -------------------------------------
+class TTSCache:
+    """
+    Content-addressed two-tier cache for synthesized audio.
+
+    Tier 1 is an in-memory LRU bounded by `memory_max_bytes`. Tier 2 is a
+    directory of <key>.mp3 files bounded by `disk_max_bytes`, evicting the
+    least recently used file first. Disk hits are promoted into memory.
+    """
+
+    def __init__(self, directory: Optional[str] = "data/tts_cache",
+                 memory_max_bytes: int = 32 * 1024 * 1024, disk_max_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.endswith(".mp3"):
+                    stat = os.stat(os.path.join(self.directory, name))
+                    entries.append((stat.st_mtime, name[:-4], stat.st_size))
+            for _, key, size in sorted(entries):
+                self._disk[key] = size
+                self._disk_bytes += size
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def _remember(self, key, audio):
+        if len(audio) > self.memory_max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return audio
+
+            if self.directory and key in self._disk:
+                try:
+                    with open(self._path(key), "rb") as file:
+                        audio = file.read()
+                    os.utime(self._path(key))
+                except FileNotFoundError:
+                    self._disk_bytes -= self._disk.pop(key)
+                else:
+                    self._disk.move_to_end(key)
+                    self._remember(key, audio)
+                    self.stats["disk_hits"] += 1
+                    return audio
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, audio: bytes):
+        with self._lock:
+            self._remember(key, audio)
+            self.stats["stores"] += 1
+            if not self.directory or key in self._disk or len(audio) > self.disk_max_bytes:
+                return
+
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "wb") as file:
+                file.write(audio)
+            os.replace(tmp_path, self._path(key))
+            self._disk[key] = len(audio)
+            self._disk_bytes += len(audio)
+            while self._disk_bytes > self.disk_max_bytes:
+                evicted_key, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                try:
+                    os.remove(self._path(evicted_key))
+                except FileNotFoundError:
+                    pass
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hits = lookups - self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes
+            }
+
+# -------------------------------------
+# CachedTTS Class
+# -------------------------------------
+class CachedTTS:
+    """
+    Drop-in front for ElevenLabsTTS that serves repeated utterances from a
+    TTSCache. Misses are synthesized upstream and stored once complete;
+    streamed misses are forwarded chunk by chunk and stored at the end.
+    """
+
+    def __init__(self, tts, cache: TTSCache):
+        self.tts = tts
+        self.cache = cache
+
+    def _key(self, text: str) -> str:
+        return cache_key(self.tts.voice_id, self.tts.voice_settings, text)
+
+    async def synthesize_speech(self, text: str) -> bytes:
+        key = self._key(text)
+        audio = await asyncio.to_thread(self.cache.get, key)
+        if audio is not None:
+            return audio
+        audio = await self.tts.synthesize_speech(text)
+        await asyncio.to_thread(self.cache.put, key, audio)
+        return audio
+
+    async def stream_speech(self, text: str, chunk_size: int = 4096) -> AsyncIterator[bytes]:
+        key = self._key(text)
+        audio = await asyncio.to_thread(self.cache.get, key)
+        if audio is not None:
+            async def iter_cached():
+                for start in range(0, len(audio), chunk_size):
+                    yield audio[start:start + chunk_size]
+            return iter_cached()
+
+        upstream = await self.tts.stream_speech(text, chunk_size)
+
+        async def iter_and_store():
+            chunks = []
+            async for chunk in upstream:
+                chunks.append(chunk)
+                yield chunk
+            # Only reached when the upstream stream completed without error
+            await asyncio.to_thread(self.cache.put, key, b"".join(chunks))
+
+        return iter_and_store()
+
+    async def aclose(self):
+        await self.tts.aclose()
@@ -1,28 +1,39 @@
 # voice.py
 
 import os
-from openai import OpenAI
+import asyncio
+from openai import AsyncOpenAI
+from http_clients import create_async_client
 
 class VoiceManager:
     """
     A minimal class to handle audio transcription with OpenAI's Whisper API.
-    In a typical web scenario, you receive an UploadFile from FastAPI and pass it to 'transcribe_audio'.
+    Create one instance for the app lifetime: it holds a pooled keep-alive
+    HTTP client, so each transcription reuses an open connection.
+    In a typical web scenario, you receive an UploadFile from FastAPI and pass its bytes to 'transcribe_audio'.
     """
 
-    def __init__(self, openai_api_key: str):
-        self.client = OpenAI(api_key=openai_api_key)
+    def __init__(self, openai_api_key: str, max_connections: int = 20, timeout: float = 60.0, http_client=None):
+        self._owns_http_client = http_client is None
+        self.http_client = http_client or create_async_client(max_connections=max_connections, timeout=timeout)
+        self.client = AsyncOpenAI(api_key=openai_api_key, http_client=self.http_client, timeout=timeout)
 
-    def transcribe_audio(self, file_obj, filename="recording.wav", mime="audio/wav"):
-        transcription = self.client.audio.transcriptions.create(
+    async def transcribe_audio(self, file_obj, filename="recording.wav", mime="audio/wav"):
+        transcription = await self.client.audio.transcriptions.create(
             model="whisper-1",
             file=(filename, file_obj, mime),
             response_format="text"
         )
         return transcription
 
+    async def aclose(self):
+        if self._owns_http_client:
+            await self.http_client.aclose()
+
 # Example usage
 if __name__ == "__main__":
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise Exception("OPENAI_API_KEY not set in environment variables")
     voice_manager = VoiceManager(api_key)
+    asyncio.run(voice_manager.aclose())